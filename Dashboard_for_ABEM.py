@@ -1,50 +1,179 @@
 import os
+import sys
+import csv
 import glob
+import json
+import time
+import hashlib
+import secrets
+import shutil
+import socket
+import tempfile
+import zlib
+import base64
+import threading
+import traceback
+import warnings
+from collections import OrderedDict, namedtuple
+from functools import lru_cache, wraps
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import parse_qs, parse_qsl
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
-from dash import Dash, dcc, html
+import plotly.io as pio
+from plotly.utils import PlotlyJSONEncoder
+from dash import Dash, dash_table, dcc, html, no_update, Patch
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
-from dash.dependencies import Input, Output, State, MATCH, ALL
+from flask import Response, abort, jsonify, request, send_from_directory, stream_with_context
+from dash.dependencies import Input, Output, State, MATCH, ALL, ClientsideFunction
 from dash_bootstrap_templates import load_figure_template
+from dash.background_callback.managers import BaseBackgroundCallbackManager
+
+try:  # pyarrow is optional: without it the on-disk cache is skipped, CSVs use the C parser
+    import pyarrow  # and exports are CSV only
+    import pyarrow.dataset
+    import pyarrow.ipc
+    HAVE_ARROW = True
+except ImportError:
+    HAVE_ARROW = False
+
+try:  # brotli is optional: callback responses are then brotli- rather than gzip-compressed
+    import brotli  # for browsers that accept it
+    HAVE_BROTLI = True
+except ImportError:
+    HAVE_BROTLI = False
 # =========================================================
 # 1. LOAD DATA
 # =========================================================
 
-BASE_DIR = r"C:/Users/3059534/OneDrive - Queen's University Belfast/Documents/Research/ABEM/Exec/Output_SimResults/Simulation_data"
+BASE_DIR = os.environ.get(
+    "ABEM_BASE_DIR",
+    r"C:/Users/3059534/OneDrive - Queen's University Belfast/Documents/Research/ABEM/Exec/Output_SimResults/Simulation_data",
+)
 PATTERN = os.path.join(BASE_DIR, "Industrial_results_for_period_*.csv")
 
-file_paths = sorted(glob.glob(PATTERN))
-if not file_paths:
-    raise FileNotFoundError(f"No CSVs found at {PATTERN}")
+# Columnar cache of the combined, typed period frame (Arrow IPC / Feather),
+# kept next to each run's data together with a manifest of the source files.
+CACHE_DIRNAME = ".abem_cache"
+CACHE_FORMAT = 2
+USE_CACHE = HAVE_ARROW and os.environ.get("ABEM_CACHE", "1") != "0"
 
-frames = []
-for fp in file_paths:
-    df_tmp = pd.read_csv(fp)
-    df_tmp.columns = [c.strip() for c in df_tmp.columns]
-    try:
-        period = int(os.path.splitext(os.path.basename(fp))[0].split("_")[-1])
-    except Exception:
-        period = len(frames)
-    df_tmp["Period"] = period
-    frames.append(df_tmp)
+# Parallel ingestion: number of parser threads (1 = serial). The pyarrow CSV
+# engine only pays off past its per-file start-up cost, so small period files
+# stay on the C parser.
+INGEST_WORKERS = max(1, int(os.environ.get("ABEM_INGEST_WORKERS", min(8, os.cpu_count() or 1))))
+ARROW_CSV_MIN_BYTES = int(os.environ.get("ABEM_ARROW_CSV_MIN_BYTES", 1 << 20))
 
-df = pd.concat(frames, ignore_index=True)
+# Compact storage mode: small ints for IDs/periods, float32 metrics (when the
+# round-trip stays within COMPACT_RTOL), categoricals, unused columns dropped.
+COMPACT = os.environ.get("ABEM_COMPACT", "0") == "1"
+COMPACT_RTOL = float(os.environ.get("ABEM_COMPACT_RTOL", 1e-6))
 
-economy_wide_df = pd.read_csv(BASE_DIR + "/Economy-wide_periodic_results.csv")
+# Shared data plane for multi-worker servers (gunicorn): the first worker writes
+# each run, fully processed, to uncompressed Arrow files; every worker then
+# memory-maps them, so the data pages are shared between processes.
+SHARED = HAVE_ARROW and os.environ.get("ABEM_SHARED", "0") == "1"
+SHARED_WAIT_S = float(os.environ.get("ABEM_SHARED_WAIT_S", 600))
 
-numeric_cols = [
-    "Industry ID", "Period",
-    "Total domestic production CVM", "Imports CVM", "Actual Exports CVM",
-    "Total Sales", "Total Goods for Sale", "Employment"
-]
-for c in numeric_cols:
-    if c in df.columns:
-        df[c] = pd.to_numeric(df[c], errors="coerce")
+# Storage backend of the per-industry rows: "memory" (one pandas frame, the
+# default) or "arrow", an out-of-core store for runs larger than RAM. The store
+# is a Parquet dataset under .abem_cache, partitioned into buckets of
+# STORE_BUCKET_INDUSTRIES industries with row groups in Period order, and only
+# the industries, periods and columns a chart or download needs are read. The
+# macro totals stay in memory. Compact, shared, live-tail and client-side modes
+# apply to "memory" only.
+STORAGE = os.environ.get("ABEM_STORAGE", "memory") if HAVE_ARROW else "memory"
+STORE_BUCKET_INDUSTRIES = int(os.environ.get("ABEM_STORE_BUCKET_INDUSTRIES", 64))
+STORE_ROW_GROUP_ROWS = 8192
 
-# =========================================================
-# 2. METRICS
-# =========================================================
+# Instrumentation: callback/route latency and payload histograms on /metrics;
+# requests slower than ABEM_SLOW_MS are logged with their inputs (0 = off).
+SLOW_MS = float(os.environ.get("ABEM_SLOW_MS", 0))
+SLOW_LOG = os.environ.get("ABEM_SLOW_LOG")  # file to append to; default stdout
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+PAYLOAD_BUCKETS = (1e3, 1e4, 1e5, 3e5, 1e6, 3e6, 1e7, 3e7)
+
+# Callback payloads: trace arrays are sent as Plotly typed arrays in the smallest
+# dtype that shows the same to HOVER_DECIMALS, and Dash/API responses of at least
+# COMPRESS_MIN_BYTES are brotli- or gzip-compressed (ABEM_COMPRESS=0 turns it off).
+HOVER_DECIMALS = 2
+COMPRESS = os.environ.get("ABEM_COMPRESS", "1") == "1"
+COMPRESS_MIN_BYTES = 1024
+COMPRESS_LEVEL = 5
+
+# Start-up: create_app() serves at once and loads the data on a background
+# thread; with ABEM_WARMUP=1 the default views are pre-rendered after loading.
+WARMUP = os.environ.get("ABEM_WARMUP", "0") == "1"
+BACKGROUND_LOAD = True
+READY_POLL_MS = 1000
+
+# Hot reload: POST /reload (with ABEM_RELOAD_TOKEN, if set, in X-ABEM-Token) or,
+# with ABEM_WATCH=1, a change under BASE_DIR seen in two scans WATCH_INTERVAL_S
+# apart rebuilds the data on a thread and swaps it in without a restart.
+RELOAD_TOKEN = os.environ.get("ABEM_RELOAD_TOKEN")
+WATCH = os.environ.get("ABEM_WATCH", "0") == "1"
+WATCH_INTERVAL_S = float(os.environ.get("ABEM_WATCH_INTERVAL_S", 5))
+
+# Background jobs (prepared downloads, calibration scoring) run outside the request
+# threads, at most JOB_WORKERS at once per process, and so do at most JOB_WORKERS
+# streamed /export downloads. Prepared files are kept in EXPORT_DIR for
+# EXPORT_KEEP_S seconds.
+JOB_WORKERS = int(os.environ.get("ABEM_JOB_WORKERS", 2))
+EXPORT_DIR = os.environ.get("ABEM_EXPORT_DIR", os.path.join(tempfile.gettempdir(), "abem-exports"))
+EXPORT_KEEP_S = 3600
+
+# Live-tail mode: poll BASE_DIR for new period files while a run is writing them
+LIVE_TAIL = os.environ.get("ABEM_LIVE_TAIL", "0") == "1" and STORAGE == "memory"
+LIVE_TAIL_INTERVAL_MS = int(os.environ.get("ABEM_LIVE_TAIL_INTERVAL_MS", 2000))
 
+# Client-side rendering: /indust and /compare figures are assembled in the
+# browser from a data bundle sent once per page load (assets/abem_clientside.js)
+CLIENTSIDE = os.environ.get("ABEM_CLIENTSIDE", "0") == "1" and STORAGE == "memory"
+CLIENTSIDE_PAGES = ("indust", "compare") if CLIENTSIDE else ()
+
+# Run catalog: further simulation runs found under ABEM_RUNS_ROOT load on first
+# use and are evicted (least recently used first) beyond the memory budget.
+RUNS_ROOT = os.environ.get("ABEM_RUNS_ROOT")
+RUN_MEMORY_BUDGET_MB = float(os.environ.get("ABEM_RUN_MEMORY_MB", 2048))
+
+# Calibration scoring: observed series (economy-wide file) -> the simulated macro
+# total it is scored against. Runs not in memory are read by SCORE_WORKERS threads.
+CALIBRATION_TARGETS = {
+    "Observed domestic production CP": "Total domestic production CP",
+    "Observed domestic production CVM": "Total domestic production CVM",
+}
+SCORE_WORKERS = int(os.environ.get("ABEM_SCORE_WORKERS", 4))
+
+# Streaming exports: format -> (label, mimetype, file extension)
+EXPORT_FORMATS = {
+    "csv": ("CSV", "text/csv", ".csv"),
+    "csv.gz": ("CSV (gzip)", "application/gzip", ".csv.gz"),
+    "parquet": ("Parquet", "application/vnd.apache.parquet", ".parquet"),
+    "feather": ("Feather (Arrow)", "application/vnd.apache.arrow.file", ".feather"),
+}
+EXPORT_CHUNK_ROWS = int(os.environ.get("ABEM_EXPORT_CHUNK_ROWS", 100_000))
+
+# Long series: above MAX_POINTS per trace, traces are LTTB-downsampled and drawn
+# with WebGL; zooming in fetches the visible window at full resolution.
+MAX_POINTS = int(os.environ.get("ABEM_MAX_POINTS", 2000))
+DTICK_MAX_PERIODS = 60  # one tick per period up to this span, automatic ticks beyond
+
+# Period resolutions: every series is also kept at coarser levels, one value per
+# bucket of `width` periods (ABEM_PERIOD_LEVELS, besides 1 = every period). The
+# "Auto" resolution uses the finest level that keeps the visible window within
+# MAX_POINTS per trace. Rolling means span ROLLING_PERIODS periods.
+PERIOD_LEVELS = tuple(sorted({1, *(int(w) for w in os.environ.get("ABEM_PERIOD_LEVELS", "4,16,64").split(",") if w.strip())}))
+ROLLING_PERIODS = int(os.environ.get("ABEM_ROLLING_PERIODS", 4))
+SERIES_TRANSFORMS = {
+    "value": "Values",
+    "rolling": f"Rolling mean ({ROLLING_PERIODS} periods)",
+    "cumulative": "Cumulative sum",
+}
+
+# Metrics shown by the pages (label -> column). They also define the ingest
+# schema: only these columns (plus Industry ID) are read from the period CSVs.
 MACRO_METRICS = {
     "Total domestic production (CP)": "Total domestic production CP",
     "Total domestic production (CVM)": "Total domestic production CVM",
@@ -54,13 +183,6 @@ MACRO_METRICS = {
     "Total Goods for Sale": "Total Goods for Sale",
 }
 
-macro_df = df.groupby("Period", as_index=False)[list(MACRO_METRICS.values())].sum()
-macro_df['Observed domestic production CP'] = economy_wide_df['Observed domestic production CP']
-macro_df['Observed domestic production CVM'] = economy_wide_df['Observed domestic production CVM']
-MACRO_METRICS["Observed total domestic production (CP)"] = "Observed domestic production CP"
-MACRO_METRICS["Observed total domestic production (CVM)"] = "Observed domestic production CVM"
-macro_options = [{"label": k, "value": v} for k, v in MACRO_METRICS.items()]
-
 INDUST_METRICS = {
     "Total domestic production (CVM)": "Total domestic production CVM",
     "Imports (CVM)": "Imports CVM",
@@ -68,606 +190,3542 @@ INDUST_METRICS = {
     "Total Sales": "Total Sales",
     "Total Goods for Sale": "Total Goods for Sale",
 }
-indust_options = [{"label": k, "value": v} for k, v in INDUST_METRICS.items()]
-default_indust_metrics = list(INDUST_METRICS.values())
 
-industry_options = [
-    {"label": str(int(i)), "value": int(i)}
-    for i in sorted(df["Industry ID"].dropna().unique().astype(int))
-]
-default_industry = int(df["Industry ID"].dropna().astype(int).min())
+# Derived metrics, added as columns of every run's frames when the run is built
+# (once per data version) and offered in the dropdowns next to the raw ones.
+# column -> (label, pandas eval expression over other columns, display unit)
+DERIVED_METRICS = {
+    "Net exports CVM": ("Net exports (CVM)", "`Actual Exports CVM` - `Imports CVM`", "£bn"),
+    "Import penetration": (
+        "Import penetration (%)",
+        "100 * `Imports CVM` / (`Total domestic production CVM` + `Imports CVM` - `Actual Exports CVM`)",
+        "%",
+    ),
+    "Sales to goods for sale": ("Sales / goods for sale (%)", "100 * `Total Sales` / `Total Goods for Sale`", "%"),
+}
 
-compare_metric_options = [{"label": k, "value": v} for k, v in INDUST_METRICS.items()]
+# column -> (label, base column, "period" on previous period | "cumulative" since the first), in %
+GROWTH_METRICS = {
+    "Total domestic production CVM growth": ("Domestic production (CVM) growth (%)", "Total domestic production CVM", "period"),
+    "Total domestic production CVM cumulative growth": (
+        "Domestic production (CVM) cumulative growth (%)", "Total domestic production CVM", "cumulative"),
+    "Total Sales growth": ("Total Sales growth (%)", "Total Sales", "period"),
+    "Total Sales cumulative growth": ("Total Sales cumulative growth (%)", "Total Sales", "cumulative"),
+}
 
-# =========================================================
-# 3. APP SETUP
-# =========================================================
-dbc_css = "https://cdn.jsdelivr.net/gh/AnnMarieW/dash-bootstrap-templates/dbc.min.css"
-app = Dash(external_stylesheets=[dbc.themes.MINTY, dbc.themes.BOOTSTRAP, dbc.icons.FONT_AWESOME, dbc_css], suppress_callback_exceptions=True, )
-server = app.server
+# Display unit of every non-money column; money is shown in £bn
+METRIC_UNITS = {col: unit for col, (_, _, unit) in DERIVED_METRICS.items()}
+METRIC_UNITS.update({col: "%" for col in GROWTH_METRICS})
 
-# =========================================================
-# 4. FIGURE FORMATTER
-# =========================================================
-# adds  templates to plotly.io
-load_figure_template(["minty", "minty_dark"])
+INGEST_DTYPES = {"Industry ID": "float64"}
+for _col in [*MACRO_METRICS.values(), *INDUST_METRICS.values()]:
+    INGEST_DTYPES[_col] = "float64"
+INGEST_COLUMNS = list(INGEST_DTYPES)
 
-def auto_place_legend(fig, theme, traces_threshold=3, is_bar_hint=False):
+
+def period_from_path(fp, fallback):
+    try:
+        return int(os.path.splitext(os.path.basename(fp))[0].split("_")[-1])
+    except Exception:
+        return fallback
+
+
+def file_signature(fp):
+    st = os.stat(fp)
+    return {"size": st.st_size, "mtime": st.st_mtime}
+
+
+def csv_engine(fp):
+    if HAVE_ARROW and os.path.getsize(fp) >= ARROW_CSV_MIN_BYTES:
+        return "pyarrow"
+    return "c"
+
+
+def read_period_csv_untyped(fp, period, usecols=None):
+    """Plain read + numeric coercion; the fallback for files with non-numeric cells."""
+    df_tmp = pd.read_csv(fp)
+    df_tmp.columns = [c.strip() for c in df_tmp.columns]
+    if usecols is not None:
+        df_tmp = df_tmp[[c for c in df_tmp.columns if c in usecols]]
+    df_tmp["Period"] = period
+    for c in df_tmp.columns:
+        if c in INGEST_DTYPES:
+            df_tmp[c] = pd.to_numeric(df_tmp[c], errors="coerce")
+    return df_tmp
+
+
+def read_period_csv(fp, period):
     """
-    Heuristic-based legend placement:
-    - If many traces OR hinted as bar chart → horizontal legend above plot (outside)
-    - Else → boxed legend inside the plot (top-left)
-    Keeps theme-adaptive background/border.
+    Typed read of one period file: only INGEST_COLUMNS are parsed, straight
+    into their INGEST_DTYPES. Header names may carry stray whitespace, so the
+    header line is read first to map stripped names back to the raw ones.
     """
+    with open(fp, newline="") as fh:
+        header = next(csv.reader(fh), [])
+    raw = {c.strip(): c for c in header if c.strip() in INGEST_DTYPES}
+    try:
+        df_tmp = pd.read_csv(
+            fp,
+            usecols=list(raw.values()),
+            dtype={r: INGEST_DTYPES[c] for c, r in raw.items()},
+            engine=csv_engine(fp),
+        )
+    except ValueError:
+        return read_period_csv_untyped(fp, period, usecols=INGEST_DTYPES)
+    df_tmp.columns = [c.strip() for c in df_tmp.columns]
+    df_tmp["Period"] = period
+    return df_tmp
 
-    # Theme-adaptive colors
-    if theme == "dark":
-        legend_bg = "rgba(20,20,20,0.6)"
-        legend_border = "rgba(255,255,255,0.3)"
-    else:
-        legend_bg = "rgba(255,255,255,0.6)"
-        legend_border = "rgba(0,0,0,0.25)"
 
-    # Determine chart type and trace count
-    trace_count = len(fig.data)
-    first_type = (fig.data[0].type if fig.data else "").lower()
+def read_period_csvs(jobs, workers=None):
+    """Parses [(path, period), ...] across a thread pool; results keep job order."""
+    workers = INGEST_WORKERS if workers is None else workers
+    if workers <= 1 or len(jobs) <= 1:
+        return [read_period_csv(fp, period) for fp, period in jobs]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda job: read_period_csv(*job), jobs))
 
-    # Treat as bar if hinted or detected
-    is_bar = is_bar_hint or first_type in ("bar",)
 
-    # Heuristic:
-    # - For bar charts OR many traces, place above the plot, horizontal, outside
-    # - Otherwise, place inside (top-left), vertical
-    if is_bar or trace_count > traces_threshold:
-        # Outside above, horizontal row
-        fig.update_layout(
-            legend=dict(
-                bgcolor=legend_bg,
-                bordercolor=legend_border,
-                borderwidth=1,
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,     # a bit above the plotting area
-                xanchor="right",
-                x=1.0,      # right-aligned
-                font=dict(size=12),
-                traceorder="normal",
-            )
-        )
-        # Add a little extra top margin to make room for the legend outside the plot
-        ml, mr = fig.layout.margin.l or 40, fig.layout.margin.r or 40
-        fig.update_layout(margin=dict(l=ml, r=mr, t=max(70, (fig.layout.margin.t or 50)), b=fig.layout.margin.b or 40))
-    else:
-        # Inside top-left, vertical box
-        fig.update_layout(
-            legend=dict(
-                bgcolor=legend_bg,
-                bordercolor=legend_border,
-                borderwidth=1,
-                orientation="v",
-                x=0.01,
-                y=0.99,
-                xanchor="left",
-                yanchor="top",
-                font=dict(size=12),
-                traceorder="normal",
-            )
-        )
+def cache_paths(base_dir):
+    """(cache dir, cache file, manifest file) for one run directory."""
+    cache_dir = os.path.join(base_dir, CACHE_DIRNAME)
+    return cache_dir, os.path.join(cache_dir, "industrial_results.feather"), os.path.join(cache_dir, "manifest.json")
 
 
-###
+def load_cache(base_dir):
+    """
+    Returns (cached_frame, manifest_files) or (None, {}) when there is no
+    usable cache (missing, unreadable or written by another cache format).
+    """
+    cache_dir, cache_file, manifest_file = cache_paths(base_dir)
+    if not (USE_CACHE and os.path.exists(cache_file) and os.path.exists(manifest_file)):
+        return None, {}
+    try:
+        with open(manifest_file) as fh:
+            manifest = json.load(fh)
+        if manifest.get("format") != CACHE_FORMAT or manifest.get("columns") != INGEST_COLUMNS:
+            return None, {}
+        return pd.read_feather(cache_file), manifest["files"]
+    except Exception as exc:
+        print(f"[cache] ignoring unreadable cache in {cache_dir}: {exc}")
+        return None, {}
 
-def format_currency_axis(fig, template, theme, height=350):
-        
-    # Adaptive legend background based on theme
-    if theme == "dark":
-        legend_bg = "rgba(20,20,20,0.6)"   # dark semi-transparent
-        legend_border = "rgba(255,255,255,0.3)"
-    else:
-        legend_bg = "rgba(255,255,255,0.6)" # light semi-transparent
-        legend_border = "rgba(0,0,0,0.25)"
-    # 
-    fig.update_layout(
-        template=template,
-        height=height,
-        autosize=False,
-        margin=dict(l=40, r=40, t=50, b=50),
-        uirevision="static",
-        title_x=0.5,
-        #legend=dict(orientation="h", y=1.05, x=0),        
-        legend=dict(
-                bgcolor=legend_bg,
-                bordercolor=legend_border,
-                borderwidth=1,
-                x=0.01,
-                y=0.99,
-                xanchor="left",
-                yanchor="top",
-                font=dict(size=12)
-            ),
-        showlegend=False,  # start hidden; JS will reveal on hover/interaction
-    )
 
-    # Integer periods
-    fig.update_xaxes(
-        tickmode="linear",
-        dtick=1,
-        tickformat=".0f",
-        title="Period"
-    )
+def save_cache(base_dir, frame, files):
+    """Atomically writes the frame + manifest; a read-only run directory just disables caching."""
+    if not USE_CACHE:
+        return
+    cache_dir, cache_file, manifest_file = cache_paths(base_dir)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        frame.reset_index(drop=True).to_feather(cache_file + ".tmp")
+        with open(manifest_file + ".tmp", "w") as fh:
+            json.dump({"format": CACHE_FORMAT, "columns": INGEST_COLUMNS, "files": files}, fh)
+        os.replace(cache_file + ".tmp", cache_file)
+        os.replace(manifest_file + ".tmp", manifest_file)
+    except Exception as exc:
+        print(f"[cache] could not write cache to {cache_dir}: {exc}")
 
-    # Y axis in BILLIONS now
-    fig.update_yaxes(
-        title="£ billion",
-        tickprefix="£",
-        tickformat=","
-    )
 
-    # Scale the data + hover to BILLIONS
-    for tr in fig.data:
-        # Scale actual plotted values
-        tr.y = tr.y / 1000
+def load_industrial_results(file_paths, base_dir=None):
+    """
+    Combined frame of every period CSV. Files whose name, size and mtime match
+    the manifest are served from the columnar cache; only added or changed
+    files are parsed, and rows of changed/removed files are dropped.
+    """
+    base_dir = BASE_DIR if base_dir is None else base_dir
+    cached, cached_files = load_cache(base_dir)
 
-        # Scale hover too (customdata)
-        tr.update(
-            customdata=tr.y,
-            hovertemplate="%{x}<br>£%{customdata:,.2f} bn<extra></extra>"
-        )
+    files = {}
+    stale = []
+    for i, fp in enumerate(file_paths):
+        name = os.path.basename(fp)
+        entry = dict(file_signature(fp), period=period_from_path(fp, i))
+        files[name] = entry
+        if cached is None or cached_files.get(name) != entry:
+            stale.append((fp, entry["period"]))
 
-    
-    #---- Auto legend placement ----
-    # Hint bar for comparison page: detect bar from first trace OR pass hint externally if you prefer.
-    first_type = (fig.data[0].type if fig.data else "").lower()
-    is_bar_hint = first_type == "bar"
-    auto_place_legend(fig, theme, traces_threshold=3, is_bar_hint=is_bar_hint)
+    frames = []
+    if cached is not None:
+        keep = {e["period"] for n, e in files.items() if cached_files.get(n) == e}
+        if len(keep) < len(cached_files):
+            cached = cached[cached["Period"].isin(keep)]
+        frames.append(cached)
+    frames += read_period_csvs(stale)
 
-    return fig
+    combined = pd.concat(frames, ignore_index=True)
+    if stale or cached is None or len(files) != len(cached_files):
+        save_cache(base_dir, combined, files)
+    print(f"[load] {len(files)} period files: {len(files) - len(stale)} from cache, {len(stale)} parsed")
+    return combined
 
-# =========================================================
-# 5. LAYOUT HELPERS
-# =========================================================
 
-def CenteredSection(children):
-    return html.Div(
-        html.Div(children, className="d-flex flex-column align-items-center text-center", style={"width": "100%"}),
-        className="container-fluid"
-    )
+def ingest_timing_report(file_paths, workers=None):
+    """
+    Times the original serial path (read everything, then coerce) against the
+    typed parallel path on the same files, bypassing the cache.
+    """
+    jobs = [(fp, period_from_path(fp, i)) for i, fp in enumerate(file_paths)]
+    workers = INGEST_WORKERS if workers is None else workers
 
-def sticky_header():
-    return html.Div(
-        [
-            dbc.Row(
-                [
-                    dbc.Col(html.H1("ABEM Simulation Dashboard", className="text-white text-center"), width=12),
-                ],
-                justify="center",
-                className="mt-2"
-            ),
-            #html.Hr(className="my-2")
-        ],
-        style={
-            "position": "sticky",
-            #"height" : "100px",
-            #"top": "25px",
-            #"zIndex": "2000",
-            #"backgroundColor": "var(--bs-body-bg)",
-            #"backdropFilter": "saturate(180%) blur(6px)",
-        },
-        className="bg-primary p-2",
-    )
+    t0 = time.perf_counter()
+    serial = pd.concat([read_period_csv_untyped(fp, period) for fp, period in jobs], ignore_index=True)
+    t_serial = time.perf_counter() - t0
 
-def nav_item(id_str, href, icon_class, label_text):
+    t0 = time.perf_counter()
+    parallel = pd.concat(read_period_csvs(jobs, workers), ignore_index=True)
+    t_parallel = time.perf_counter() - t0
+
+    engines = sorted({csv_engine(fp) for fp, _ in jobs})
+    print(f"[ingest] {len(jobs)} files, engine={'/'.join(engines)}, workers={workers}")
+    print(f"[ingest] serial   : {t_serial:8.3f}s  {serial.shape[1]} columns  {serial.memory_usage(deep=True).sum() / 1e6:,.1f} MB")
+    print(f"[ingest] parallel : {t_parallel:8.3f}s  {parallel.shape[1]} columns  {parallel.memory_usage(deep=True).sum() / 1e6:,.1f} MB")
+    print(f"[ingest] speed-up : {t_serial / max(t_parallel, 1e-9):.2f}x")
+    return {"files": len(jobs), "workers": workers, "serial_s": t_serial, "parallel_s": t_parallel}
+
+
+def smallest_int(s):
+    """Smallest integer dtype holding s; nullable (Int16...) when s has gaps."""
+    kind = "Int" if s.isna().any() else "int"
+    lo, hi = s.min(), s.max()
+    for bits in (8, 16, 32):
+        info = np.iinfo(f"int{bits}")
+        if pd.isna(lo) or (info.min <= lo and hi <= info.max):
+            return s.astype(f"{kind}{bits}")
+    return s.astype(f"{kind}64")
+
+
+def compact_frame(frame, keep, name="df"):
     """
-    A single sidebar navigation item with icon + label.
-    Tooltips show on collapsed (icon-only) mode via Bootstrap 'title' attribute.
+    Memory-compact copy of frame restricted to the `keep` columns, printing
+    the footprint before and after.
     """
-    return dcc.Link(
-        html.Div(
-            [
-                html.I(className=f"{icon_class} nav-icon", **{"data-bs-toggle": "tooltip", "data-bs-placement": "right", "title": label_text}),
-                html.Span(label_text, className="label ms-2"),
-            ],
-            id=id_str,
-            className="nav-item"
-        ),
-        href=href,
-        className="nav-link-wrapper"
-    )
+    before = frame.memory_usage(deep=True).sum()
+    out = frame[[c for c in frame.columns if c in keep]].copy()
+    for c in out.columns:
+        s = out[c]
+        if c in ("Industry ID", "Period"):
+            if s.dropna().mod(1).eq(0).all():
+                out[c] = smallest_int(s)
+        elif pd.api.types.is_float_dtype(s) and s.dtype != "float32":
+            s32 = s.astype("float32")
+            with np.errstate(over="ignore", invalid="ignore"):
+                ok = np.allclose(s32.to_numpy("float64"), s.to_numpy(), rtol=COMPACT_RTOL, atol=0, equal_nan=True)
+            if ok:
+                out[c] = s32
+        elif pd.api.types.is_object_dtype(s) or pd.api.types.is_string_dtype(s):
+            out[c] = s.astype("category")
+    after = out.memory_usage(deep=True).sum()
+    print(f"[compact] {name}: {before / 1e6:,.2f} MB -> {after / 1e6:,.2f} MB ({after / max(before, 1):.0%})")
+    return out
 
-def sidebar():
-    return html.Div(
-        [
-            # Sidebar header row (icon-only on collapsed; text hides via CSS)
-            # html.Div(
-            #     [
-            #         html.I(className="bi bi-list me-2"),
-            #         html.Span("Navigation", className="label")
-            #     ],
-            #     className="sidebar-header"
-            # ),
 
-            html.Div(
-                [
-                    nav_item("nav-macro", "/macro", "bi bi-graph-up", "MACRO"),
-                    nav_item("nav-indust", "/indust", "bi bi-building", "INDUST"),
-                    nav_item("nav-compare", "/compare", "bi bi-bar-chart-line", "COMPARISON"),
-                ],
-                className="sidebar-content"
-            ),
+def build_industry_index(frame):
+    """
+    Sorts frame by (Industry ID, Period) once and returns it together with
+    {industry: slice} so each industry is a contiguous block of rows.
+    Rows without an Industry ID sort last and are not indexed.
+    """
+    frame = frame.sort_values(["Industry ID", "Period"], kind="stable", na_position="last").reset_index(drop=True)
+    ids = frame["Industry ID"].dropna().to_numpy()
+    uniq, starts = np.unique(ids, return_index=True)
+    stops = np.append(starts[1:], len(ids))
+    return frame, {int(i): slice(int(a), int(b)) for i, a, b in zip(uniq, starts, stops)}
 
-            html.Div(className="flex-grow-1"),
-            
-            html.Span(
-                [
-                    #dbc.Label(className="fa fa-moon", html_for="theme-switch"),
-                    dbc.Switch(
-                        id="theme-switch",
-                        label="Dark mode",
-                        value=False,
-                        className="d-inline-block ms-1",
-                        style= {"fontSize": 14, },
-                        label_style={"fontSize": 14, 
-                                     "marginBottom": 0,
-                                     "marginTop": 0,
-                                     }
-                    ),
-                    #dbc.Label(className="fa fa-sun", html_for="theme-switch"),
-                ],
-                className="sidebar-footer mt-3"
-            ),
-        ],
-        id="sidebar",
-        className="sidebar expanded"  # default desktop: expanded
+
+# Everything the pages need from one simulation run
+RunData = namedtuple("RunData", ["df", "macro_df", "economy_wide_df", "industry_slices"])
+
+OBSERVED_COLUMNS = ["Observed domestic production CP", "Observed domestic production CVM"]
+
+
+def observed_by_period(economy, periods):
+    """
+    Economy-wide results indexed by Period. Files without a Period column are
+    read row by row as the given periods, in order.
+    """
+    if "Period" in economy.columns:
+        return economy.drop_duplicates("Period", keep="last").set_index("Period")
+    n = min(len(economy), len(periods))
+    return economy.iloc[:n].set_axis(pd.Index(periods[:n], name="Period"))
+
+
+def attach_observed(macro, economy):
+    """macro with the OBSERVED_COLUMNS joined on Period (NaN where a period has no observation)."""
+    periods = macro["Period"].to_numpy()
+    observed = observed_by_period(economy, periods).reindex(index=periods, columns=OBSERVED_COLUMNS)
+    for c in OBSERVED_COLUMNS:
+        macro[c] = observed[c].to_numpy()
+    return macro
+
+
+def build_macro_df(frame, economy):
+    macro = frame.groupby("Period", as_index=False)[[c for c in MACRO_METRICS.values() if c in frame.columns]].sum()
+    return attach_observed(macro, economy)
+
+
+def data_key(files):
+    """
+    Hash of everything a run's loaded data depends on: the signatures of the
+    files read ({file name: signature}), schema and storage mode. The same in
+    every worker and after a restart, as long as the files are unchanged.
+    """
+    spec = {"format": CACHE_FORMAT, "columns": INGEST_COLUMNS, "compact": COMPACT, "files": files,
+            "derived": [DERIVED_METRICS, GROWTH_METRICS]}
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def shared_key(base_dir, file_paths):
+    """data_key() of a shared snapshot of base_dir."""
+    files = {os.path.basename(fp): file_signature(fp) for fp in file_paths}
+    files["Economy-wide_periodic_results.csv"] = file_signature(base_dir + "/Economy-wide_periodic_results.csv")
+    return data_key(files)
+
+
+def frame_to_arrow(frame):
+    """Table whose float columns keep NaN as values (not nulls), so they map back zero-copy."""
+    arrays = {}
+    for c in frame.columns:
+        s = frame[c]
+        if isinstance(s.dtype, np.dtype) and s.dtype.kind in "biuf":
+            arrays[c] = pyarrow.array(s.to_numpy(), from_pandas=False)
+        else:
+            arrays[c] = pyarrow.Array.from_pandas(s)
+    table = pyarrow.table(arrays)
+    return table.replace_schema_metadata({"dtypes": json.dumps({c: str(frame[c].dtype) for c in frame.columns})})
+
+
+def arrow_to_frame(table):
+    frame = table.to_pandas(split_blocks=True, self_destruct=False)
+    for c, dtype in json.loads(table.schema.metadata[b"dtypes"]).items():
+        if str(frame[c].dtype) != dtype:  # nullable ints come back as float
+            frame[c] = frame[c].astype(dtype)
+    return frame
+
+
+def map_shared_run(shared_dir):
+    """RunData backed by memory-mapped Arrow files; None when the snapshot is missing."""
+    try:
+        with open(os.path.join(shared_dir, "slices.json")) as fh:
+            slices = {int(i): slice(a, b) for i, (a, b) in json.load(fh).items()}
+        parts = []
+        for name in ("df", "macro", "economy"):
+            source = pyarrow.memory_map(os.path.join(shared_dir, name + ".arrow"))
+            parts.append(arrow_to_frame(pyarrow.ipc.open_file(source).read_all()))
+    except FileNotFoundError:
+        return None
+    return RunData(parts[0], parts[1], parts[2], slices)
+
+
+def publish_shared_run(cache_dir, shared_dir, run):
+    """Writes run into a fresh directory and renames it into place, then drops older snapshots."""
+    tmp_dir = f"{shared_dir}.tmp{os.getpid()}"
+    os.makedirs(tmp_dir, exist_ok=True)
+    for name, frame in (("df", run.df), ("macro", run.macro_df), ("economy", run.economy_wide_df)):
+        table = frame_to_arrow(frame.reset_index(drop=True))
+        with pyarrow.OSFile(os.path.join(tmp_dir, name + ".arrow"), "wb") as sink:
+            with pyarrow.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    with open(os.path.join(tmp_dir, "slices.json"), "w") as fh:
+        json.dump({i: [s.start, s.stop] for i, s in run.industry_slices.items()}, fh)
+    os.replace(tmp_dir, shared_dir)
+    for old in glob.glob(os.path.join(cache_dir, "shared-*")):
+        if old != shared_dir and ".tmp" not in old:
+            for fp in glob.glob(os.path.join(old, "*")):
+                try:
+                    os.remove(fp)  # workers still mapping the old files keep their pages
+                except OSError:
+                    pass
+            try:
+                os.rmdir(old)
+            except OSError:
+                pass
+
+
+def process_gone(owner):
+    """True if `owner` ({"pid", "host"} of a lock or job file) is a process on this host that has exited."""
+    # os.kill(pid, 0) would terminate the process on Windows
+    if os.name != "nt" and owner.get("host") == socket.gethostname():
+        try:
+            os.kill(owner["pid"], 0)
+        except ProcessLookupError:
+            return True
+        except OSError:
+            pass  # alive, but another user's
+    return False
+
+
+def shared_lock_abandoned(lock):
+    """
+    True if the worker holding `lock` died while building: its process is gone
+    (checked for owners on this host) or the lock is older than SHARED_WAIT_S.
+    """
+    try:
+        started = os.path.getmtime(lock)
+        with open(lock) as fh:
+            owner = json.load(fh)
+    except FileNotFoundError:
+        return False
+    except (OSError, ValueError):
+        owner = {}  # created but not written yet
+    return time.time() - owner.get("time", started) > SHARED_WAIT_S or process_gone(owner)
+
+
+def load_shared_run(base_dir, file_paths):
+    """
+    load_run for multi-worker servers: maps the snapshot matching the current
+    files, or builds it under a lock file while the other workers wait. The
+    lock names its owner, so a lock left by a killed worker is broken instead
+    of holding up every later start.
+    """
+    cache_dir = cache_paths(base_dir)[0]
+    shared_dir = os.path.join(cache_dir, "shared-" + shared_key(base_dir, file_paths))
+    run = map_shared_run(shared_dir)
+    if run is not None:
+        print(f"[shared] mapped {shared_dir}")
+        return run
+
+    lock = shared_dir + ".lock"
+    deadline = time.time() + SHARED_WAIT_S
+    while True:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            pass
+        except OSError as exc:
+            print(f"[shared] cannot write to {cache_dir} ({exc}); loading privately")
+            return build_run(base_dir, file_paths)
+        while os.path.exists(lock) and time.time() < deadline and not shared_lock_abandoned(lock):
+            time.sleep(0.2)
+        run = map_shared_run(shared_dir)
+        if run is not None:
+            print(f"[shared] mapped {shared_dir}")
+            return run
+        if time.time() >= deadline:
+            print(f"[shared] no snapshot after waiting on {lock}; loading privately")
+            return build_run(base_dir, file_paths)
+        if os.path.exists(lock):
+            # Two workers may both break it and build; the snapshot is renamed into place, so one wins
+            print(f"[shared] breaking abandoned lock {lock}")
+            try:
+                os.remove(lock)
+            except FileNotFoundError:
+                pass
+        # Then take the lock and build, whether it was abandoned or released without a snapshot
+
+    with os.fdopen(fd, "w") as fh:
+        json.dump({"pid": os.getpid(), "host": socket.gethostname(), "time": time.time()}, fh)
+    try:
+        run = build_run(base_dir, file_paths)
+        try:
+            publish_shared_run(cache_dir, shared_dir, run)
+        except OSError as exc:
+            print(f"[shared] could not write {shared_dir}: {exc}")
+            return run
+    finally:
+        try:
+            os.remove(lock)
+        except FileNotFoundError:
+            pass  # broken by a worker that took us for dead
+    print(f"[shared] wrote {shared_dir}")
+    return map_shared_run(shared_dir) or run
+
+
+class IndustryStore:
+    """
+    Out-of-core stand-in for a run's industry frame (ABEM_STORAGE=arrow). Reads
+    skip the buckets of other industries and the row groups outside the periods
+    asked for, and decode only the requested columns. Derived and growth metrics
+    are not stored: they are computed on read by add_derived_metrics, as in
+    memory. `columns` lists what can be read, like frame.columns.
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json")) as fh:
+            meta = json.load(fh)
+        self.path = path
+        self.base_columns = meta["columns"]
+        self.counts = {int(i): n for i, n in meta["counts"].items()}
+        self.periods = np.array(meta["periods"], dtype="int64")
+        self.dataset = pyarrow.dataset.dataset(os.path.join(path, "rows"), format="parquet", partitioning=store_partitioning())
+        probe = pd.DataFrame(columns=["Industry ID", "Period", *self.base_columns], dtype="float64")
+        self.columns = [c for c in add_derived_metrics(probe, True).columns if c not in ("Industry ID", "Period")]
+
+    def read(self, industries=None, columns=None, periods=None):
+        """
+        Frame of Industry ID, Period and `columns` (default all) for the given
+        industries (default all), sorted by (Industry ID, Period). With
+        periods=(x0, x1), only that range plus one period either side.
+        """
+        columns = self.columns if columns is None else [c for c in dict.fromkeys(columns) if c in self.columns]
+        derived = [c for c in columns if c in DERIVED_COLUMNS]
+        field = pyarrow.dataset.field
+        conditions = []
+        if industries is not None:
+            ids = sorted({int(i) for i in industries})
+            conditions += [field("bucket").isin(sorted({i // STORE_BUCKET_INDUSTRIES for i in ids})),
+                           field("Industry ID").isin([float(i) for i in ids])]
+        # Growth metrics need each industry's earlier periods, so they are cut to the range after computing
+        history = any(c in GROWTH_METRICS for c in derived)
+        if periods is not None:
+            span = self.periods[window_slice(self.periods, periods)]
+            periods = (span[0], span[-1]) if len(span) else (1, 0)
+            if not history:
+                conditions += [field("Period") >= int(periods[0]), field("Period") <= int(periods[1])]
+        condition = None
+        for c in conditions:
+            condition = c if condition is None else condition & c
+
+        table = self.dataset.to_table(columns=["Industry ID", "Period", *(self.base_columns if derived else columns)],
+                                      filter=condition)
+        frame = table.to_pandas().sort_values(["Industry ID", "Period"], kind="stable", ignore_index=True)
+        if derived:
+            frame = add_derived_metrics(frame, True)
+            if periods is not None and history:
+                frame = frame[frame["Period"].between(*periods)].reset_index(drop=True)
+        return frame[["Industry ID", "Period", *columns]]
+
+    def pivot(self, col, industries=None, periods=None):
+        """Pivot of one column over the given industries (default all) and the periods they have."""
+        frame = self.read(industries, [col], periods)
+        inds = sorted(self.counts) if industries is None else sorted({int(i) for i in industries} & self.counts.keys())
+        inds, pers = np.array(inds, dtype="int64"), np.unique(frame["Period"].to_numpy())
+        values = np.full((len(inds), len(pers)), np.nan)
+        if col in frame.columns:
+            rows = np.searchsorted(inds, frame["Industry ID"].to_numpy())
+            values[rows, np.searchsorted(pers, frame["Period"].to_numpy())] = frame[col].to_numpy("float64")
+        return Pivot(inds, pers, values)
+
+    def batches(self, industries, columns, rows):
+        """read() of the given industries, in their order, as frames of about `rows` rows (whole industries each)."""
+        batch, size, empty = [], 0, True
+        for ind in dict.fromkeys(int(i) for i in industries):
+            if ind not in self.counts:
+                continue
+            batch.append(ind)
+            size += self.counts[ind]
+            if size >= rows:
+                yield self.read_in_order(batch, columns)
+                batch, size, empty = [], 0, False
+        if batch or empty:
+            yield self.read_in_order(batch, columns)
+
+    def read_in_order(self, industries, columns):
+        frame = self.read(industries, columns)
+        position = {ind: k for k, ind in enumerate(industries)}
+        return frame.iloc[np.argsort(frame["Industry ID"].map(position).to_numpy(), kind="stable")]
+
+
+def store_partitioning():
+    return pyarrow.dataset.partitioning(pyarrow.schema([("bucket", pyarrow.int32())]), flavor="hive")
+
+
+def build_store(base_dir, file_paths, path):
+    """
+    Streams the period files into a store at `path` a few at a time, so the
+    rows never have to fit in memory. The macro totals are summed on the way
+    and saved with it, observed series attached.
+    """
+    jobs = sorted(((fp, period_from_path(fp, i)) for i, fp in enumerate(file_paths)), key=lambda job: job[1])
+    metrics = [c for c in INGEST_COLUMNS if c != "Industry ID"]
+    schema = pyarrow.schema([("Industry ID", pyarrow.float64()), ("Period", pyarrow.int64()),
+                             *[(c, pyarrow.float64()) for c in metrics], ("bucket", pyarrow.int32())])
+    seen, counts, periods, macro_parts = set(), {}, set(), []
+
+    def batch(frames):
+        for frame in frames:
+            seen.update(frame.columns)
+        frame = pd.concat([f.reindex(columns=["Industry ID", "Period", *metrics]) for f in frames], ignore_index=True)
+        macro_parts.append(frame.groupby("Period", as_index=False)[[c for c in MACRO_METRICS.values() if c in metrics]].sum())
+        frame = frame[frame["Industry ID"].notna()]
+        ids, n = np.unique(frame["Industry ID"].to_numpy("int64"), return_counts=True)
+        for ind, k in zip(ids.tolist(), n.tolist()):
+            counts[ind] = counts.get(ind, 0) + k
+        periods.update(frame["Period"].unique().tolist())
+        frame = frame.assign(bucket=frame["Industry ID"].to_numpy("int64") // STORE_BUCKET_INDUSTRIES)
+        return pyarrow.RecordBatch.from_pandas(frame, schema=schema, preserve_index=False)
+
+    def batches():
+        # Files are parsed a few at a time and written a row group's worth of rows at a time
+        step, pending, size = 4 * INGEST_WORKERS, [], 0
+        for i in range(0, len(jobs), step):
+            for frame in read_period_csvs(jobs[i:i + step]):
+                pending.append(frame)
+                size += len(frame)
+            if size >= STORE_ROW_GROUP_ROWS:
+                yield batch(pending)
+                pending, size = [], 0
+        if pending:
+            yield batch(pending)
+
+    pyarrow.dataset.write_dataset(
+        pyarrow.RecordBatchReader.from_batches(schema, batches()), os.path.join(path, "rows"), format="parquet",
+        partitioning=store_partitioning(), min_rows_per_group=STORE_ROW_GROUP_ROWS, max_rows_per_group=STORE_ROW_GROUP_ROWS,
+    )
+    economy = pd.read_csv(base_dir + "/Economy-wide_periodic_results.csv")
+    macro = pd.concat(macro_parts, ignore_index=True).groupby("Period", as_index=False).sum()
+    macro = attach_observed(macro[[c for c in macro.columns if c == "Period" or c in seen]], economy)
+    macro.to_feather(os.path.join(path, "macro.feather"))
+    with open(os.path.join(path, "meta.json"), "w") as fh:
+        json.dump({"columns": [c for c in metrics if c in seen], "counts": counts, "periods": sorted(periods)}, fh)
+
+
+def prune_stores(root, current):
+    """Removes older stores except the newest one before `current`, which requests may still be reading."""
+    older = [p for p in glob.glob(os.path.join(root, "store-*")) if p != current and ".tmp" not in p]
+    for p in sorted(older, key=os.path.getmtime, reverse=True)[1:]:
+        shutil.rmtree(p, ignore_errors=True)
+
+
+def load_store_run(base_dir, file_paths):
+    """
+    load_run for ABEM_STORAGE=arrow: opens the store matching the current
+    files, building it first if there is none. `industry_slices` are then the
+    row ranges of each industry in the store's (Industry ID, Period) order.
+    """
+    root = cache_paths(base_dir)[0]
+    try:
+        os.makedirs(root, exist_ok=True)
+    except OSError:  # read-only run directory
+        root = os.path.join(tempfile.gettempdir(), "abem-store-" + hashlib.sha1(os.path.abspath(base_dir).encode()).hexdigest()[:8])
+    path = os.path.join(root, "store-" + shared_key(base_dir, file_paths))
+    if not os.path.exists(os.path.join(path, "meta.json")):
+        t0 = time.perf_counter()
+        tmp = f"{path}.tmp{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        try:
+            build_store(base_dir, file_paths, tmp)
+            os.replace(tmp, path)
+        except OSError:
+            if not os.path.exists(os.path.join(path, "meta.json")):
+                raise
+            # another worker finished first
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        print(f"[store] wrote {len(file_paths)} period files to {path} in {time.perf_counter() - t0:.2f}s")
+        prune_stores(root, path)
+
+    store = IndustryStore(path)
+    macro = add_derived_metrics(pd.read_feather(os.path.join(path, "macro.feather")), False)
+    economy = pd.read_csv(base_dir + "/Economy-wide_periodic_results.csv")
+    ids = sorted(store.counts)
+    stops = np.cumsum([store.counts[i] for i in ids], dtype="int64")
+    slices = {i: slice(int(stop) - store.counts[i], int(stop)) for i, stop in zip(ids, stops)}
+    return RunData(store, macro, economy, slices)
+
+
+def load_run(base_dir, file_paths=None):
+    """Ingests one run directory into a RunData (macro aggregate, compaction, industry index)."""
+    pattern = os.path.join(base_dir, "Industrial_results_for_period_*.csv")
+    file_paths = sorted(glob.glob(pattern)) if file_paths is None else file_paths
+    if not file_paths:
+        raise FileNotFoundError(f"No CSVs found at {pattern}")
+    if STORAGE == "arrow":
+        return load_store_run(base_dir, file_paths)
+    if SHARED:
+        return load_shared_run(base_dir, file_paths)
+    return build_run(base_dir, file_paths)
+
+
+def add_derived_metrics(frame, by_industry):
+    """
+    frame with the DERIVED_METRICS and GROWTH_METRICS columns (re)computed.
+    With by_industry the frame must be sorted by (Industry ID, Period), as
+    build_industry_index leaves it; growth then restarts at each industry.
+    Metrics whose inputs are missing are skipped.
+    """
+    cols = {}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for col, (_, expr, _) in DERIVED_METRICS.items():
+            try:
+                cols[col] = frame.eval(expr)
+            except (KeyError, NameError, pd.errors.UndefinedVariableError):
+                continue
+        for col, (_, base, kind) in GROWTH_METRICS.items():
+            if base not in frame.columns:
+                continue
+            s = frame[base]
+            grouped = s.groupby(frame["Industry ID"], sort=False) if by_industry else None
+            if kind == "period":
+                prev = grouped.shift(1) if by_industry else s.shift(1)
+            else:
+                prev = grouped.transform("first") if by_industry else s.dropna().iloc[0] if s.notna().any() else np.nan
+            cols[col] = 100 * (s / prev - 1)
+    cols = {c: v.replace([np.inf, -np.inf], np.nan) for c, v in cols.items()}
+    return frame.assign(**cols)
+
+
+def build_run(base_dir, file_paths):
+    frame = load_industrial_results(file_paths, base_dir)
+    economy = pd.read_csv(base_dir + "/Economy-wide_periodic_results.csv")
+    macro = build_macro_df(frame, economy)
+
+    # Compacting happens after the macro aggregation so the sums see full precision
+    if COMPACT:
+        frame = compact_frame(frame, ["Industry ID", "Period", *INDUST_METRICS.values(), *MACRO_METRICS.values()])
+        macro = compact_frame(macro, ["Period", *MACRO_METRICS.values(), *OBSERVED_COLUMNS], name="macro_df")
+
+    frame, slices = build_industry_index(frame)
+    return RunData(add_derived_metrics(frame, True), add_derived_metrics(macro, False), economy, slices)
+
+
+def dir_signature(base_dir):
+    """{file name: signature} of a run directory's period files and economy-wide file."""
+    paths = glob.glob(os.path.join(base_dir, "Industrial_results_for_period_*.csv"))
+    paths.append(os.path.join(base_dir, "Economy-wide_periodic_results.csv"))
+    return {os.path.basename(fp): file_signature(fp) for fp in paths if os.path.exists(fp)}
+
+
+# The default run's data is one immutable snapshot, replaced whole by
+# publish_dataset() under a new version (start-up, /reload, the file watcher,
+# the live tail). Every request pins the snapshot current when it starts, so a
+# swap during a callback is never seen half-way and never blocks it.
+# `files` holds the signatures of the files the snapshot was read from and
+# `key` is their data_key(), which unlike the version is shared across workers.
+Dataset = namedtuple(
+    "Dataset", ["version", "run", "file_paths", "files", "industry_options", "default_industry", "key"]
+)
+_dataset = Dataset(0, None, [], {}, [], None, "")
+_pinned = threading.local()
+_publish_lock = threading.Lock()
+
+
+def dataset():
+    """The snapshot this thread reads: the one pinned by its request, else the latest."""
+    return getattr(_pinned, "dataset", None) or _dataset
+
+
+def pin_dataset():
+    """Pins the latest snapshot for the rest of the current request."""
+    _pinned.dataset = _dataset
+
+
+# Module-level copies of the latest snapshot, for scripts. Filled by load_data():
+# in the background by create_app(), or directly, so importing does no I/O.
+DATA_VERSION = 0
+file_paths = []
+current_run = None
+df = macro_df = economy_wide_df = None
+industry_slices = {}
+industry_options = []
+default_industry = None
+
+# =========================================================
+# 2. METRICS
+# =========================================================
+
+MACRO_METRICS["Observed total domestic production (CP)"] = "Observed domestic production CP"
+MACRO_METRICS["Observed total domestic production (CVM)"] = "Observed domestic production CVM"
+DERIVED_COLUMNS = [*DERIVED_METRICS, *GROWTH_METRICS]
+for _col, (_label, *_) in {**DERIVED_METRICS, **GROWTH_METRICS}.items():
+    MACRO_METRICS[_label] = _col
+    INDUST_METRICS[_label] = _col
+macro_options = [{"label": k, "value": v} for k, v in MACRO_METRICS.items()]
+
+
+def metric_unit(col):
+    return METRIC_UNITS.get(col, "£bn")
+
+
+def display_scale(col):
+    """Factor from stored to plotted values: money is plotted in £bn, percentages as they are."""
+    return 1.0 if metric_unit(col) == "%" else 1e-3
+
+
+def industry_frame(ind, run=None, columns=None, periods=None):
+    """
+    Rows of one industry, already sorted by Period: a view of the in-memory
+    frame (not a scan), or read from an out-of-core store, which reads only
+    `columns` and the periods=(x0, x1) window asked for.
+    """
+    frame, _, _, slices = run or dataset().run  # one read, so frame and slices always match
+    try:
+        sl = slices.get(int(ind))
+    except (TypeError, ValueError):
+        sl = None
+    if isinstance(frame, IndustryStore):
+        return frame.read([ind] if sl is not None else [], columns, periods)
+    return frame.iloc[sl] if sl is not None else frame.iloc[0:0]
+
+
+# Dense (industry x period) matrices of the industry metrics. The cell index of
+# every row is computed once per run and data version; each metric's matrix is
+# then a single vectorized scatter, cached until the data changes.
+Pivot = namedtuple("Pivot", ["industries", "periods", "values"])
+
+
+@lru_cache(maxsize=8)
+def pivot_index(run_name, version):
+    """(run, industries, periods, row of each frame row, column of each frame row); NaN IDs excluded."""
+    run = run_catalog.get(run_name)
+    ids = run.df["Industry ID"].to_numpy("float64")
+    has_id = ~np.isnan(ids)
+    period = run.df["Period"].to_numpy("float64")[has_id]
+    industries = np.array(sorted(run.industry_slices))
+    periods = np.unique(period)
+    rows, cols = np.searchsorted(industries, ids[has_id]), np.searchsorted(periods, period)
+    if isinstance(run.df["Period"].dtype, np.dtype) and run.df["Period"].dtype.kind in "iu":
+        periods = periods.astype(run.df["Period"].dtype)  # integer periods stay integers on the x axis
+    return run, industries, periods, has_id, rows, cols
+
+
+def last_valid(matrix):
+    """Last non-NaN value of each row (NaN for empty rows)."""
+    ok = ~np.isnan(matrix)
+    last = matrix.shape[1] - 1 - np.argmax(ok[:, ::-1], axis=1)
+    return np.where(ok.any(axis=1), matrix[np.arange(len(matrix)), last], np.nan)
+
+
+@lru_cache(maxsize=32)
+def industry_pivot(run_name, col, version):
+    """Pivot(industries, periods, values) with values a float64 (industries x periods) array, NaN where missing."""
+    store = run_catalog.get(run_name).df
+    if isinstance(store, IndustryStore):
+        return store.pivot(col)
+    run, industries, periods, has_id, rows, cols = pivot_index(run_name, version)
+    values = np.full((len(industries), len(periods)), np.nan)
+    if col in run.df.columns:
+        values[rows, cols] = run.df[col].to_numpy("float64")[has_id]
+    return Pivot(industries, periods, values)
+
+
+# Period pyramid: each metric at every PERIOD_LEVELS resolution, for all
+# industries at once (from the pivot) or for macro_df, built once per run,
+# column and data version. A level has one column per bucket of `width`
+# periods, placed at the bucket's last period: the bucket mean, the rolling
+# mean as of that period and the running total up to it.
+Level = namedtuple("Level", ["periods", "value", "rolling", "cumulative"])
+
+
+def period_levels(periods, values):
+    """{width: Level} for a (rows x periods) float matrix over sorted periods; NaN cells are skipped."""
+    ok = ~np.isnan(values)
+    filled = np.where(ok, values, 0.0)
+    total, count = np.cumsum(filled, axis=1), np.cumsum(ok, axis=1)
+    lagged = lambda a: np.concatenate([np.zeros((len(a), ROLLING_PERIODS)), a], axis=1)[:, :a.shape[1]]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rolling = (total - lagged(total)) / (count - lagged(count))
+    cumulative = np.where(count > 0, total, np.nan)
+
+    levels = {1: Level(periods, values, rolling, cumulative)}
+    for width in PERIOD_LEVELS[1:]:
+        if not len(periods):
+            levels[width] = levels[1]
+            continue
+        bucket = (np.asarray(periods, dtype="float64") - periods[0]) // width
+        starts = np.flatnonzero(np.diff(bucket, prepend=-1))
+        ends = np.append(starts[1:], len(periods)) - 1
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.add.reduceat(filled, starts, axis=1) / np.add.reduceat(ok, starts, axis=1)
+        levels[width] = Level(periods[ends], mean, rolling[:, ends], cumulative[:, ends])
+    return levels
+
+
+@lru_cache(maxsize=32)
+def industry_pyramid(run_name, col, version):
+    """(industries, {width: Level}) of one industry metric; level rows follow `industries`."""
+    pivot = industry_pivot(run_name, col, version)
+    return pivot.industries, period_levels(pivot.periods, pivot.values)
+
+
+@lru_cache(maxsize=32)
+def macro_pyramid(run_name, col, version):
+    """{width: Level} of one macro_df column, as single-row matrices."""
+    macro = run_catalog.get(run_name).macro_df
+    values = macro[col].to_numpy("float64") if col in macro.columns else np.full(len(macro), np.nan)
+    return period_levels(macro["Period"].to_numpy(), values[None, :])
+
+
+# What the charts read for a handful of industries. In memory that is the
+# cached whole-run pivot or pyramid; an out-of-core store reads just those
+# industries' rows, so no whole-run matrix is built for a chart.
+def selected_pivot(run_name, col, industries, window=None):
+    """Pivot covering at least `industries` (and the window=(x0, x1) periods)."""
+    store = run_catalog.get(run_name).df
+    if isinstance(store, IndustryStore):
+        return store.pivot(col, industries, window)
+    return industry_pivot(run_name, col, dataset().version)
+
+
+def selected_pyramid(run_name, col, industries):
+    """(industries, {width: Level}) like industry_pyramid, covering at least `industries`."""
+    store = run_catalog.get(run_name).df
+    if isinstance(store, IndustryStore):
+        pivot = store.pivot(col, industries)
+        return pivot.industries, period_levels(pivot.periods, pivot.values)
+    return industry_pyramid(run_name, col, dataset().version)
+
+# Live tail bookkeeping: files already in df, files seen once but maybe still
+# being written, and when each period's file landed on disk.
+ingested_files = set()
+pending_files = {}
+period_landed = {}
+_tail_lock = threading.Lock()
+_last_scan = 0.0
+
+
+def ingest_new_periods():
+    """
+    Appends period files that appeared since the last load to the default run
+    and publishes the result. A file is taken once its size and mtime are
+    unchanged between two scans, so files still being written are left for
+    the next poll. Returns the new periods.
+    """
+    global _last_scan
+    with _tail_lock:
+        now = time.time()
+        if now - _last_scan < LIVE_TAIL_INTERVAL_MS / 2000:
+            return []
+        _last_scan = now
+
+        jobs = []
+        for fp in sorted(glob.glob(PATTERN)):
+            name = os.path.basename(fp)
+            if name in ingested_files:
+                continue
+            sig = file_signature(fp)
+            if pending_files.get(name) != sig:
+                pending_files[name] = sig
+                continue
+            jobs.append((fp, period_from_path(fp, len(ingested_files) + len(jobs))))
+            period_landed[jobs[-1][1]] = sig["mtime"]
+        if not jobs:
+            return []
+
+        # Built on the latest snapshot, not the one pinned by the polling request
+        latest = _dataset
+        df, macro_df = latest.run.df, latest.run.macro_df
+        files = dict(latest.files)
+        economy_fp = os.path.join(BASE_DIR, "Economy-wide_periodic_results.csv")
+        files["Economy-wide_periodic_results.csv"] = file_signature(economy_fp)
+        new = pd.concat(read_period_csvs(jobs), ignore_index=True)
+        economy_wide_df = pd.read_csv(economy_fp)
+        new_macro = new.groupby("Period", as_index=False)[[c for c in macro_df.columns if c in new.columns and c != "Period"]].sum()
+
+        # Match the dtypes of the running frames (compact mode)
+        new = new[[c for c in df.columns if c in new.columns]]
+        for target, frame in ((new, df), (new_macro, macro_df)):
+            for c in target.columns:
+                try:
+                    target[c] = target[c].astype(frame[c].dtype)
+                except (TypeError, ValueError):
+                    pass
+        macro = pd.concat([macro_df[~macro_df["Period"].isin(new_macro["Period"])], new_macro], ignore_index=True)
+        macro = attach_observed(macro.sort_values("Period", kind="stable").reset_index(drop=True), economy_wide_df)
+
+        frame, slices = build_industry_index(pd.concat([df, new], ignore_index=True))
+        frame, macro = add_derived_metrics(frame, True), add_derived_metrics(macro, False)
+        for fp, _ in jobs:
+            name = os.path.basename(fp)
+            ingested_files.add(name)
+            files[name] = pending_files.pop(name)
+        publish_dataset(RunData(frame, macro, economy_wide_df, slices), [*latest.file_paths, *(fp for fp, _ in jobs)], files)
+        periods = sorted(p for _, p in jobs)
+        print(f"[live] ingested periods {periods[0]}..{periods[-1]} ({len(jobs)} files)")
+        return periods
+
+
+DEFAULT_RUN = os.path.basename(os.path.normpath(BASE_DIR))
+
+
+def discover_runs(root):
+    """{run name: directory} for every folder under root holding ABEM period output."""
+    runs = {}
+    if not root:
+        return runs
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d != CACHE_DIRNAME]
+        if "Economy-wide_periodic_results.csv" in filenames and any(
+            f.startswith("Industrial_results_for_period_") and f.endswith(".csv") for f in filenames
+        ):
+            if os.path.normpath(dirpath) != os.path.normpath(BASE_DIR):
+                runs[os.path.relpath(dirpath, root).replace(os.sep, "/")] = dirpath
+    return runs
+
+
+def run_bytes(run):
+    # An out-of-core store's rows are on disk, not in memory
+    return sum(int(f.memory_usage(deep=True).sum()) for f in run[:3] if isinstance(f, pd.DataFrame))
+
+
+class RunCatalog:
+    """
+    Simulation runs by name. DEFAULT_RUN is always the pinned dataset's run;
+    other runs are loaded on first access and the least recently used ones are
+    evicted once the loaded runs exceed budget_bytes. A run is loaded outside
+    the lock: callers asking for the same run wait on its Future, the rest of
+    the catalog stays available.
+    """
+
+    def __init__(self, runs, budget_bytes):
+        self.runs = runs
+        self.budget_bytes = budget_bytes
+        self._loaded = OrderedDict()
+        self._loading = {}  # name -> Future of the load in progress
+        self._lock = threading.Lock()
+
+    def names(self):
+        return [DEFAULT_RUN] + sorted(n for n in self.runs if n != DEFAULT_RUN)
+
+    def loaded(self, name):
+        """The run if it is already in memory (no load, no LRU update), else None."""
+        if name == DEFAULT_RUN:
+            return dataset().run
+        with self._lock:
+            entry = self._loaded.get(name)
+        return entry[0] if entry else None
+
+    def loaded_bytes(self):
+        return sum(size for _, size, _ in self._loaded.values())
+
+    def key(self, name):
+        """data_key() of the run: as loaded, or as a load now would read it."""
+        if name == DEFAULT_RUN:
+            return dataset().key
+        with self._lock:
+            entry = self._loaded.get(name)
+        return entry[2] if entry else data_key(dir_signature(self.runs[name]))
+
+    def drop_changed(self):
+        """Forgets loaded runs that left the catalog or whose files changed since they were loaded."""
+        with self._lock:
+            for name, (_, _, key) in list(self._loaded.items()):
+                if name not in self.runs or data_key(dir_signature(self.runs[name])) != key:
+                    del self._loaded[name]
+                    print(f"[runs] dropped {name}: changed since it was loaded")
+
+    def get(self, name):
+        if name == DEFAULT_RUN:
+            return dataset().run
+        with self._lock:
+            if name in self._loaded:
+                self._loaded.move_to_end(name)
+                return self._loaded[name][0]
+            future = self._loading.get(name)
+            owner = future is None
+            if owner:
+                base_dir = self.runs[name]
+                future = self._loading[name] = Future()
+        if not owner:
+            return future.result()
+        try:
+            key = data_key(dir_signature(base_dir))  # taken first, like load_data()
+            run = load_run(base_dir)
+        except BaseException as exc:
+            with self._lock:
+                del self._loading[name]
+            future.set_exception(exc)
+            raise
+        with self._lock:
+            del self._loading[name]
+            self._loaded[name] = (run, run_bytes(run), key)
+            while len(self._loaded) > 1 and self.loaded_bytes() > self.budget_bytes:
+                evicted, (_, size, _) = self._loaded.popitem(last=False)
+                print(f"[runs] evicted {evicted} ({size / 1e6:,.1f} MB)")
+            print(f"[runs] loaded {name}; {len(self._loaded)} runs in memory, {self.loaded_bytes() / 1e6:,.1f} MB")
+        future.set_result(run)
+        return run
+
+
+run_catalog = RunCatalog({}, RUN_MEMORY_BUDGET_MB * 1e6)
+run_options = []
+
+indust_options = [{"label": k, "value": v} for k, v in INDUST_METRICS.items()]
+default_indust_metrics = [c for c in INDUST_METRICS.values() if c not in DERIVED_COLUMNS]
+
+compare_metric_options = [{"label": k, "value": v} for k, v in INDUST_METRICS.items()]
+
+# Loader state, served by /readyz and shown by the pages while loading
+data_ready = threading.Event()
+load_state = {"status": "idle", "error": None, "seconds": None}
+
+
+def publish_dataset(run, paths, files):
+    """
+    Makes `run` the default run's data under the next version. The swap is a
+    single assignment, so readers get the old snapshot or the new one whole;
+    the version-keyed caches are emptied so the old data is not served again.
+    """
+    global _dataset, DATA_VERSION, file_paths, current_run, df, macro_df, economy_wide_df, industry_slices
+    global industry_options, default_industry
+    with _publish_lock:
+        industries = sorted(run.industry_slices)
+        data = Dataset(
+            _dataset.version + 1, run, list(paths), dict(files),
+            [{"label": str(i), "value": i} for i in industries], industries[0] if industries else None,
+            data_key(files),
+        )
+        _dataset = data
+        DATA_VERSION, file_paths, current_run = data.version, data.file_paths, run
+        df, macro_df, economy_wide_df, industry_slices = run
+        industry_options, default_industry = data.industry_options, data.default_industry
+        clear_data_caches()
+    return data
+
+
+def load_data():
+    """
+    (Re)loads BASE_DIR and discovers the catalog runs, then publishes the new
+    data. Callbacks keep reading the previous snapshot until the swap.
+    """
+    global run_options
+    files = dir_signature(BASE_DIR)  # taken first, so later changes show up against it
+    paths = sorted(glob.glob(PATTERN))
+    run = load_run(BASE_DIR, paths)
+    run_catalog.runs = discover_runs(RUNS_ROOT)
+    run_catalog.drop_changed()
+    run_catalog.budget_bytes = RUN_MEMORY_BUDGET_MB * 1e6
+    run_options = [{"label": n, "value": n} for n in run_catalog.names()]
+
+    with _tail_lock:
+        # Files added since `paths` was listed are left for the live tail
+        data = publish_dataset(run, paths, files)
+        ingested_files.clear()
+        ingested_files.update(os.path.basename(fp) for fp in paths)
+        pending_files.clear()
+    if isinstance(run.df, pd.DataFrame):
+        pivot_index(DEFAULT_RUN, data.version)
+    return run
+
+# =========================================================
+# 3. APP SETUP
+# =========================================================
+
+class JobCancelled(Exception):
+    pass
+
+
+class _JobStore:
+    """Where a job writes progress and results (LocalJobManager.put for that job)."""
+
+    def __init__(self, put):
+        self.put = put
+
+    def set(self, key, value):
+        self.put(key, value)
+
+
+def run_job(fn, progress, store, result_key, progress_key, args):
+    """
+    Runs a background callback and stores what Dash's managers store under
+    result_key: its output, the no-update marker, or the error and traceback.
+    The callback context is not set up; the job callbacks here use neither
+    dash.callback_context nor set_props.
+    """
+    def set_progress(value):
+        store.set(progress_key, list(value) if isinstance(value, (list, tuple)) else [value])
+
+    extra = [set_progress] if progress else []
+    try:
+        if isinstance(args, dict):
+            output = fn(*extra, **args)
+        elif isinstance(args, (list, tuple)):
+            output = fn(*extra, *args)
+        else:
+            output = fn(*extra, args)
+    except JobCancelled:
+        raise
+    except PreventUpdate:
+        store.set(result_key, {"_dash_no_update": "_dash_no_update"})
+    except Exception as err:
+        store.set(result_key, {"background_callback_error": {"msg": str(err), "tb": traceback.format_exc()}})
+    else:
+        store.set(result_key, output)
+
+
+# Jobs run on threads of the worker that received the request, so they read the
+# data, run catalog and calibration caches that worker already holds. What the
+# page polls for (progress, the result, cancellation, and Dash's signing secret
+# for the job handles) is kept in files under JOB_DIR, so that any worker of a
+# multi-process server can answer the poll.
+JOB_DIR = os.path.join(EXPORT_DIR, "jobs")
+
+
+class LocalJobManager(BaseBackgroundCallbackManager):
+    """
+    Dash background-callback manager without diskcache or a broker. At most
+    `workers` jobs run at once per process, each on a thread. Results and
+    progress are JSON files in `root`, next to a marker per running job. A
+    cancelled job stops at its next progress update.
+    """
+
+    def __init__(self, workers, root):
+        self.root = root
+        self.slots = threading.BoundedSemaphore(workers)
+        super().__init__(None)
+
+    def _path(self, key):
+        return os.path.join(self.root, hashlib.sha1(key.encode()).hexdigest() + ".json")
+
+    def _job_path(self, job, suffix):
+        return os.path.join(self.root, f"job-{job}{suffix}")
+
+    def _write(self, path, value):
+        tmp = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump(value, fh, cls=PlotlyJSONEncoder)
+        os.replace(tmp, path)
+
+    def _pop(self, path, default=None):
+        try:
+            with open(path) as fh:
+                value = json.load(fh)
+            os.remove(path)
+        except FileNotFoundError:  # not written yet, or another worker's poll took it
+            return default
+        return value
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def prune(self):
+        """Removes results nobody polled for, and markers of jobs whose worker was killed."""
+        cutoff = time.time() - EXPORT_KEEP_S
+        for fp in glob.glob(os.path.join(self.root, "*.*")):
+            try:
+                if os.path.getmtime(fp) < cutoff:
+                    os.remove(fp)
+            except OSError:
+                pass
+
+    def put(self, job, key, value):
+        if os.path.exists(self._job_path(job, ".cancel")):
+            raise JobCancelled()
+        self._write(self._path(key), value)
+        os.utime(self._job_path(job, ".json"))  # a long job's marker outlives prune()
+
+    def make_job_fn(self, fn, progress, key=None):
+        return fn, progress
+
+    def call_job_fn(self, key, job_fn, args, context):
+        os.makedirs(self.root, mode=0o700, exist_ok=True)
+        self.prune()
+        job = secrets.token_hex(8)
+        marker = self._job_path(job, ".json")
+        self._write(marker, {"pid": os.getpid(), "host": socket.gethostname(), "time": time.time()})
+        job_args = (key, self._make_progress_key(key), args)
+
+        def supervise():
+            try:
+                with self.slots:
+                    if not os.path.exists(self._job_path(job, ".cancel")):
+                        fn, progress = job_fn
+                        run_job(fn, progress, _JobStore(lambda k, v: self.put(job, k, v)), *job_args)
+            except JobCancelled:
+                pass
+            finally:
+                # After the result: a poll that finds neither treats the job as cancelled
+                self._remove(marker)
+                self._remove(self._job_path(job, ".cancel"))
+
+        threading.Thread(target=supervise, name=f"abem-job-{job}", daemon=True).start()
+        return job
+
+    def terminate_job(self, job):
+        if job is not None and os.path.exists(self._job_path(job, ".json")):
+            open(self._job_path(job, ".cancel"), "w").close()
+
+    def terminate_unhealthy_job(self, job):
+        return False
+
+    def job_running(self, job):
+        marker = self._job_path(job, ".json")
+        try:
+            with open(marker) as fh:
+                owner = json.load(fh)
+        except FileNotFoundError:
+            return False
+        if process_gone(owner):  # its worker was killed mid-job
+            self._remove(marker)
+            return False
+        return True
+
+    def get_progress(self, key):
+        return self._pop(self._path(self._make_progress_key(key)))
+
+    def result_ready(self, key):
+        return os.path.exists(self._path(key))
+
+    def get_result(self, key, job):
+        result = self._pop(self._path(key), self.UNDEFINED)
+        if result is not self.UNDEFINED:
+            self._remove(self._path(self._make_progress_key(key)))
+        return result
+
+    def get_updated_props(self, key):
+        return self._pop(self._path(self._make_set_props_key(key)), {})
+
+    def clear_cache_entry(self, key):
+        self._remove(self._path(key))
+
+    def get_or_create_signing_secret(self, generate):
+        # The first worker to get here writes the secret; the link fails for the others
+        os.makedirs(self.root, mode=0o700, exist_ok=True)
+        path = os.path.join(self.root, "signing-secret")
+        if not os.path.exists(path):
+            tmp = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(generate())
+            try:
+                os.link(tmp, path)
+            except FileExistsError:
+                pass
+            finally:
+                os.remove(tmp)
+        with open(path, "rb") as fh:
+            return fh.read()
+
+
+def make_job_manager():
+    return LocalJobManager(JOB_WORKERS, JOB_DIR)
+
+
+job_manager = make_job_manager()
+
+dbc_css = "https://cdn.jsdelivr.net/gh/AnnMarieW/dash-bootstrap-templates/dbc.min.css"
+app = Dash(external_stylesheets=[dbc.themes.MINTY, dbc.themes.BOOTSTRAP, dbc.icons.FONT_AWESOME, dbc_css], suppress_callback_exceptions=True,
+           background_callback_manager=job_manager)
+server = app.server
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram keyed by a tuple of (label, value) pairs."""
+
+    def __init__(self, name, help_text, buckets):
+        self.name, self.help_text, self.buckets = name, help_text, buckets
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            counts, n, total = self.series.get(labels, ([0] * len(self.buckets), 0, 0.0))
+            for i, le in enumerate(self.buckets):
+                if value <= le:
+                    counts[i] += 1
+            self.series[labels] = (counts, n + 1, total + value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, (list(c), n, t)) for labels, (c, n, t) in self.series.items())
+        for labels, (counts, n, total) in items:
+            lab = ",".join(f'{k}="{v}"' for k, v in labels)
+            for le, c in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{lab},le="{le:g}"}} {c}')
+            lines.append(f'{self.name}_bucket{{{lab},le="+Inf"}} {n}')
+            lines.append(f"{self.name}_sum{{{lab}}} {total:.6f}")
+            lines.append(f"{self.name}_count{{{lab}}} {n}")
+        return lines
+
+
+CALLBACK_SECONDS = Histogram("abem_callback_seconds", "Dash callback wall time by phase", LATENCY_BUCKETS)
+CALLBACK_BYTES = Histogram("abem_callback_payload_bytes", "Dash callback response size", PAYLOAD_BUCKETS)
+ROUTE_SECONDS = Histogram("abem_route_seconds", "Export/API request wall time, to the last byte streamed", LATENCY_BUCKETS)
+ROUTE_BYTES = Histogram("abem_route_payload_bytes", "Export/API response size", PAYLOAD_BUCKETS)
+WIRE_BYTES = Histogram("abem_wire_bytes", "Dash/API response size as sent, after compression", PAYLOAD_BUCKETS)
+
+# Per-request timing state; phase() is a no-op outside a server request (e.g. benchmarks)
+_request_timing = threading.local()
+
+
+class phase:
+    """with phase("format"): ... adds the block's wall time to the current request's phases."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+
+    def __exit__(self, *exc):
+        phases = getattr(_request_timing, "phases", None)
+        if phases is not None:
+            phases[self.name] = phases.get(self.name, 0.0) + time.perf_counter() - self.t0
+
+
+# Every server-side callback is timed as phase "callback"; the rest of the
+# request ("serialize") is Dash's argument handling and JSON encoding.
+_register_callback = app.callback
+
+
+def instrumented_callback(*args, **kwargs):
+    register = _register_callback(*args, **kwargs)
+
+    def wrap(func):
+        @wraps(func)
+        def timed_callback(*a, **kw):
+            _request_timing.callback = func.__name__
+            with phase("callback"):
+                return func(*a, **kw)
+        return register(timed_callback)
+    return wrap
+
+
+app.callback = instrumented_callback
+
+
+def log_slow_request(kind, name, total, phases, size, inputs):
+    line = json.dumps({"time": time.strftime("%Y-%m-%dT%H:%M:%S"), kind: name, "ms": round(total * 1000, 1),
+                       "phases_ms": {k: round(v * 1000, 1) for k, v in phases.items()}, "bytes": size, "inputs": inputs},
+                      default=str)
+    if SLOW_LOG:
+        with open(SLOW_LOG, "a") as fh:
+            fh.write(line + "\n")
+    else:
+        print(f"[slow] {line}")
+
+
+TIMED_ROUTES = ("export", "api_series", "api_macro", "api_calibration")
+
+
+def timed_request():
+    return request.path.endswith("/_dash-update-component") or request.endpoint in TIMED_ROUTES
+
+
+@server.before_request
+def start_request_timer():
+    if timed_request():
+        _request_timing.t0 = time.perf_counter()
+        _request_timing.phases = {}
+        _request_timing.callback = None
+
+
+COMPRESSED_DASH_PATHS = ("/_dash-update-component", "/_dash-layout", "/_dash-dependencies")
+COMPRESSED_ROUTES = ("api_meta", "api_series", "api_macro", "api_calibration")
+
+
+# Registered before record_request_timing, so it runs after it (Flask runs
+# after_request hooks in reverse) and the payload histograms see the raw size
+@server.after_request
+def compress_response(response):
+    """Brotli (if installed) or gzip for Dash and API responses the client accepts compressed."""
+    dash_request = request.path.endswith(COMPRESSED_DASH_PATHS)
+    if not COMPRESS or not (dash_request or request.endpoint in COMPRESSED_ROUTES):
+        return response
+    if response.status_code != 200 or response.direct_passthrough or response.is_streamed or "Content-Encoding" in response.headers:
+        return response
+
+    data = response.get_data()
+    accepted = request.accept_encodings
+    encoding = "identity"
+    if len(data) >= COMPRESS_MIN_BYTES:
+        if HAVE_BROTLI and accepted["br"]:
+            encoding, data = "br", brotli.compress(data, quality=COMPRESS_LEVEL)
+        elif accepted["gzip"]:
+            gz = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 31)
+            encoding, data = "gzip", gz.compress(data) + gz.flush()
+    if encoding != "identity":
+        response.set_data(data)
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+
+    if dash_request:
+        name = (getattr(_request_timing, "callback", None) or "unknown") if request.path.endswith("/_dash-update-component") else request.path.rsplit("/", 1)[-1]
+    else:
+        name = request.endpoint
+    WIRE_BYTES.observe((("path", name), ("encoding", encoding)), len(data))
+    return response
+
+
+@server.after_request
+def record_request_timing(response):
+    if not timed_request() or getattr(_request_timing, "phases", None) is None:
+        return response
+    t0, phases = _request_timing.t0, _request_timing.phases
+    _request_timing.phases = None
+
+    if request.endpoint not in TIMED_ROUTES:
+        total = time.perf_counter() - t0
+        name = _request_timing.callback or "unknown"
+        size = response.calculate_content_length() or 0
+        phases["serialize"] = max(total - phases.get("callback", 0.0), 0.0)
+        for p, seconds in phases.items():
+            CALLBACK_SECONDS.observe((("callback", name), ("phase", p)), seconds)
+        CALLBACK_SECONDS.observe((("callback", name), ("phase", "total")), total)
+        CALLBACK_BYTES.observe((("callback", name),), size)
+        if SLOW_MS and total * 1000 >= SLOW_MS:
+            body = request.get_json(silent=True) or {}
+            log_slow_request("callback", name, total, phases, size,
+                             {"inputs": body.get("inputs"), "state": body.get("state")})
+        return response
+
+    # Routes may stream: count bytes as they go out and record when the stream closes
+    name = request.endpoint
+    args = request.args.to_dict(flat=False)
+    sent = [0]
+
+    def counted(chunks):
+        for chunk in chunks:
+            sent[0] += len(chunk)
+            yield chunk
+
+    def finished():
+        total = time.perf_counter() - t0
+        ROUTE_SECONDS.observe((("route", name),), total)
+        ROUTE_BYTES.observe((("route", name),), sent[0])
+        if SLOW_MS and total * 1000 >= SLOW_MS:
+            log_slow_request("route", name, total, phases, sent[0], args)
+
+    if response.direct_passthrough or response.is_streamed:
+        response.response = counted(response.response)
+    else:
+        sent[0] = response.calculate_content_length() or 0
+    response.call_on_close(finished)
+    return response
+
+
+@server.route("/metrics")
+def metrics():
+    """Prometheus text exposition of the histograms plus a few gauges."""
+    cache = figure_cache_stats()
+    lines = []
+    for hist in (CALLBACK_SECONDS, CALLBACK_BYTES, ROUTE_SECONDS, ROUTE_BYTES, WIRE_BYTES):
+        lines += hist.render()
+    gauges = {
+        "abem_data_version": ("Data version (bumped on every reload/append)", _dataset.version),
+        "abem_figure_cache_hits": ("Figure cache hits", cache["hits"]),
+        "abem_figure_cache_misses": ("Figure cache misses", cache["misses"]),
+        "abem_figure_cache_size": ("Figures in the cache", cache["size"]),
+        "abem_runs_loaded_bytes": ("Memory held by catalog runs", run_catalog.loaded_bytes()),
+    }
+    for name, (help_text, value) in gauges.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value}"]
+    return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
+# =========================================================
+# 4. FIGURE FORMATTER
+# =========================================================
+# adds  templates to plotly.io
+load_figure_template(["minty", "minty_dark"])
+
+def figure_template(theme):
+    return "minty_dark" if theme == "dark" else "minty"
+
+def legend_colors(theme):
+    """Theme-adaptive (background, border) for the legend box."""
+    if theme == "dark":
+        return "rgba(20,20,20,0.6)", "rgba(255,255,255,0.3)"   # dark semi-transparent
+    return "rgba(255,255,255,0.6)", "rgba(0,0,0,0.25)"         # light semi-transparent
+
+def auto_place_legend(fig, theme, traces_threshold=3, is_bar_hint=False):
+    """
+    Heuristic-based legend placement:
+    - If many traces OR hinted as bar chart → horizontal legend above plot (outside)
+    - Else → boxed legend inside the plot (top-left)
+    Keeps theme-adaptive background/border.
+    """
+
+    # Theme-adaptive colors
+    legend_bg, legend_border = legend_colors(theme)
+
+    # Determine chart type and trace count
+    trace_count = len(fig.data)
+    first_type = (fig.data[0].type if fig.data else "").lower()
+
+    # Treat as bar if hinted or detected
+    is_bar = is_bar_hint or first_type in ("bar",)
+
+    # Heuristic:
+    # - For bar charts OR many traces, place above the plot, horizontal, outside
+    # - Otherwise, place inside (top-left), vertical
+    if is_bar or trace_count > traces_threshold:
+        # Outside above, horizontal row
+        fig.update_layout(
+            legend=dict(
+                bgcolor=legend_bg,
+                bordercolor=legend_border,
+                borderwidth=1,
+                orientation="h",
+                yanchor="bottom",
+                y=1.02,     # a bit above the plotting area
+                xanchor="right",
+                x=1.0,      # right-aligned
+                font=dict(size=12),
+                traceorder="normal",
+            )
+        )
+        # Add a little extra top margin to make room for the legend outside the plot
+        ml, mr = fig.layout.margin.l or 40, fig.layout.margin.r or 40
+        fig.update_layout(margin=dict(l=ml, r=mr, t=max(70, (fig.layout.margin.t or 50)), b=fig.layout.margin.b or 40))
+    else:
+        # Inside top-left, vertical box
+        fig.update_layout(
+            legend=dict(
+                bgcolor=legend_bg,
+                bordercolor=legend_border,
+                borderwidth=1,
+                orientation="v",
+                x=0.01,
+                y=0.99,
+                xanchor="left",
+                yanchor="top",
+                font=dict(size=12),
+                traceorder="normal",
+            )
+        )
+
+
+###
+
+def format_currency_axis(fig, template, theme, height=350):
+        
+    # Adaptive legend background based on theme
+    legend_bg, legend_border = legend_colors(theme)
+    # 
+    fig.update_layout(
+        template=template,
+        height=height,
+        autosize=False,
+        margin=dict(l=40, r=40, t=50, b=50),
+        uirevision="static",
+        title_x=0.5,
+        #legend=dict(orientation="h", y=1.05, x=0),        
+        legend=dict(
+                bgcolor=legend_bg,
+                bordercolor=legend_border,
+                borderwidth=1,
+                x=0.01,
+                y=0.99,
+                xanchor="left",
+                yanchor="top",
+                font=dict(size=12)
+            ),
+        showlegend=False,  # start hidden; JS will reveal on hover/interaction
+    )
+
+    # Integer periods: a tick per period on short runs, automatic ticks on long ones
+    span = max((np.nanmax(tr.x) - np.nanmin(tr.x) for tr in fig.data if tr.x is not None and len(tr.x)), default=0)
+    if span <= DTICK_MAX_PERIODS:
+        fig.update_xaxes(tickmode="linear", dtick=1)
+    else:
+        fig.update_xaxes(tickmode="auto")
+    fig.update_xaxes(
+        tickformat=".0f",
+        title="Period"
+    )
+
+    # Percentage metrics (trace meta "%") keep their values; with money traces
+    # alongside they go on a second y axis on the right
+    pct = [tr.meta == "%" for tr in fig.data]
+    if pct and all(pct):
+        fig.update_yaxes(title="%", ticksuffix="%", tickformat=",")
+    else:
+        # Y axis in BILLIONS now
+        fig.update_yaxes(
+            title="£ billion",
+            tickprefix="£",
+            tickformat=","
+        )
+        if any(pct):
+            fig.update_layout(yaxis2=dict(title="%", ticksuffix="%", overlaying="y", side="right", showgrid=False))
+
+    for tr, is_pct in zip(fig.data, pct):
+        if is_pct:
+            tr.update(hovertemplate="%{x}<br>%{y:,.2f}%<extra></extra>")
+            if not all(pct):
+                tr.update(yaxis="y2")
+            continue
+
+        # Scale money to BILLIONS (the hover reads the plotted values)
+        tr.y = tr.y / 1000
+        tr.update(hovertemplate="%{x}<br>£%{y:,.2f} bn<extra></extra>")
+
+    
+    #---- Auto legend placement ----
+    # Hint bar for comparison page: detect bar from first trace OR pass hint externally if you prefer.
+    first_type = (fig.data[0].type if fig.data else "").lower()
+    is_bar_hint = first_type == "bar"
+    auto_place_legend(fig, theme, traces_threshold=3, is_bar_hint=is_bar_hint)
+
+    return fig
+
+# =========================================================
+# 5. LAYOUT HELPERS
+# =========================================================
+
+def CenteredSection(children):
+    return html.Div(
+        html.Div(children, className="d-flex flex-column align-items-center text-center", style={"width": "100%"}),
+        className="container-fluid"
+    )
+
+def sticky_header():
+    return html.Div(
+        [
+            dbc.Row(
+                [
+                    dbc.Col(html.H1("ABEM Simulation Dashboard", className="text-white text-center"), width=12),
+                ],
+                justify="center",
+                className="mt-2"
+            ),
+            #html.Hr(className="my-2")
+        ],
+        style={
+            "position": "sticky",
+            #"height" : "100px",
+            #"top": "25px",
+            #"zIndex": "2000",
+            #"backgroundColor": "var(--bs-body-bg)",
+            #"backdropFilter": "saturate(180%) blur(6px)",
+        },
+        className="bg-primary p-2",
+    )
+
+def nav_item(id_str, href, icon_class, label_text):
+    """
+    A single sidebar navigation item with icon + label.
+    Tooltips show on collapsed (icon-only) mode via Bootstrap 'title' attribute.
+    """
+    return dcc.Link(
+        html.Div(
+            [
+                html.I(className=f"{icon_class} nav-icon", **{"data-bs-toggle": "tooltip", "data-bs-placement": "right", "title": label_text}),
+                html.Span(label_text, className="label ms-2"),
+            ],
+            id=id_str,
+            className="nav-item"
+        ),
+        href=href,
+        className="nav-link-wrapper"
+    )
+
+def sidebar():
+    return html.Div(
+        [
+            # Sidebar header row (icon-only on collapsed; text hides via CSS)
+            # html.Div(
+            #     [
+            #         html.I(className="bi bi-list me-2"),
+            #         html.Span("Navigation", className="label")
+            #     ],
+            #     className="sidebar-header"
+            # ),
+
+            html.Div(
+                [
+                    nav_item("nav-macro", "/macro", "bi bi-graph-up", "MACRO"),
+                    nav_item("nav-indust", "/indust", "bi bi-building", "INDUST"),
+                    nav_item("nav-compare", "/compare", "bi bi-bar-chart-line", "COMPARISON"),
+                    nav_item("nav-heatmap", "/heatmap", "bi bi-grid-3x3", "HEATMAP"),
+                    nav_item("nav-calibration", "/calibration", "bi bi-bullseye", "CALIBRATION"),
+                ],
+                className="sidebar-content"
+            ),
+
+            html.Div(className="flex-grow-1"),
+            
+            html.Span(
+                [
+                    #dbc.Label(className="fa fa-moon", html_for="theme-switch"),
+                    dbc.Switch(
+                        id="theme-switch",
+                        label="Dark mode",
+                        value=False,
+                        className="d-inline-block ms-1",
+                        style= {"fontSize": 14, },
+                        label_style={"fontSize": 14, 
+                                     "marginBottom": 0,
+                                     "marginTop": 0,
+                                     }
+                    ),
+                    #dbc.Label(className="fa fa-sun", html_for="theme-switch"),
+                ],
+                className="sidebar-footer mt-3"
+            ),
+        ],
+        id="sidebar",
+        className="sidebar expanded"  # default desktop: expanded
+    )
+
+def run_selector(page):
+    """Run multi-select row for pages that can overlay runs (only when the catalog has several)."""
+    if len(run_options) < 2 or page in CLIENTSIDE_PAGES:
+        return []
+    return [
+        dbc.Row(
+            dbc.Col(
+                [
+                    html.Label("Runs"),
+                    dcc.Dropdown(
+                        id={"type": "run-multi", "page": page},
+                        options=run_options,
+                        value=[DEFAULT_RUN],
+                        multi=True,
+                    ),
+                ],
+                width=8,
+            ),
+            justify="center",
+            style={"width": "80%", "margin": "0 auto", "marginBottom": "20px"},
+        )
+    ]
+
+def resolution_controls(level_id, transform_id):
+    """Resolution (period pyramid level) and Show (values / rolling mean / cumulative) columns."""
+    levels = [{"label": "Auto", "value": "auto"}] + [
+        {"label": "Every period" if w == 1 else f"{w} periods", "value": w} for w in PERIOD_LEVELS
+    ]
+    return [
+        dbc.Col(
+            [
+                html.Label("Resolution"),
+                dcc.Dropdown(id=level_id, options=levels, value="auto", clearable=False),
+            ],
+            width=3,
+        ),
+        dbc.Col(
+            [
+                html.Label("Show"),
+                dcc.Dropdown(
+                    id=transform_id,
+                    options=[{"label": label, "value": key} for key, label in SERIES_TRANSFORMS.items()],
+                    value="value",
+                    clearable=False,
+                ),
+            ],
+            width=3,
+        ),
+    ]
+
+def resolution_selector(page):
+    """Resolution row for the server-drawn time series pages."""
+    if page in CLIENTSIDE_PAGES:
+        return []
+    return [
+        dbc.Row(
+            resolution_controls({"type": "resolution", "page": page}, {"type": "transform", "page": page}),
+            className="g-3",
+            justify="center",
+            style={"width": "80%", "margin": "0 auto", "marginBottom": "20px"},
+        )
+    ]
+
+def export_controls(page):
+    """Format picker + download link; the link points at the streaming /export route."""
+    return [
+        html.Div(
+            [
+                dcc.Dropdown(
+                    id={"type": "export-format", "page": page},
+                    options=[{"label": label, "value": fmt} for fmt, (label, _, _) in EXPORT_FORMATS.items()],
+                    value="csv",
+                    clearable=False,
+                    style={"width": "170px"},
+                ),
+                *([dbc.Checkbox(
+                    id={"type": "export-all", "page": page},
+                    label="All industries & indicators",
+                    value=False,
+                    className="ms-2",
+                )] if page == "compare" else []),
+                html.A(
+                    "Download",
+                    id={"type": "download-btn", "page": page},
+                    href=f"/export?scope={page}",
+                    className="btn btn-outline-primary ms-2",
+                    # COMPARISON selections can be large: the link only carries the
+                    # query and the file is prepared by a background job instead
+                    style={"display": "none"} if page == "compare" else None,
+                ),
+                *(prepare_export_controls() if page == "compare" else []),
+            ],
+            className="d-flex align-items-center justify-content-center mt-2",
+        )
+    ]
+
+def prepare_export_controls():
+    """Prepare/Cancel buttons, progress bar and the link to the finished file (COMPARISON page)."""
+    return [
+        dbc.Button("Prepare download", id="export-start", color="primary", outline=True, className="ms-2"),
+        dbc.Button("Cancel", id="export-cancel", color="secondary", outline=True, disabled=True, className="ms-2"),
+        dbc.Progress(id="export-progress", value=0, striped=True, animated=True,
+                     style={"width": "160px", "display": "none"}, className="ms-2"),
+        html.A(id="export-file", className="ms-2", style={"display": "none"}),
+    ]
+
+def graph_type(page):
+    """Client-side pages use their own graph type so draw_timeseries never targets them."""
+    return "cs-graph" if page in CLIENTSIDE_PAGES else "ts-graph"
+
+def graph_stores(page):
+    """Per-page stores for the server graphs (+ interval and latency readout in live-tail mode)."""
+    if page in CLIENTSIDE_PAGES:
+        return []
+    children = [
+        dcc.Store(id={"type": "tail-store", "page": page}),
+        dcc.Store(id={"type": "zoom-store", "page": page}),
+    ]
+    if LIVE_TAIL:
+        children += [
+            dcc.Interval(id={"type": "tail-interval", "page": page}, interval=LIVE_TAIL_INTERVAL_MS),
+            dcc.Store(id={"type": "tail-latency", "page": page}),
+            html.Small(id={"type": "tail-status", "page": page}, className="text-muted mt-1"),
+        ]
+    return children
+
+# =========================================================
+# 6. PAGE BODIES
+# =========================================================
+
+def macro_body():
+    return html.Div([
+        CenteredSection([
+            html.H2("Macroeconomic Time Series"),
+            dbc.Row([
+                dbc.Col([
+                    html.Label("Indicators"),
+                    dcc.Dropdown(
+                        id={"type": "metrics-dropdown", "page": "macro"},
+                        options=macro_options,
+                        value=["Observed domestic production CVM", "Total domestic production CVM"],
+                        multi=True,
+                    )],
+                    width = 8,
+                    ),
+                ],
+                className="g-3",
+                justify="center",
+                style={"width": "80%", "margin": "0 auto", "marginBottom": "20px"},
+            ),
+            *run_selector("macro"),
+            *resolution_selector("macro"),
+            dcc.Graph(id={"type": "ts-graph", "page": "macro"}, style={"width": "100%", "height": "520px"}),
+            *export_controls("macro"),
+            *graph_stores("macro"),
+        ])
+    ])
+
+
+def indust_body(industry=None):
+    data = dataset()
+    return html.Div([
+        CenteredSection([
+            html.H2("Microeconomic Time Series"),
+
+            # ---- Row for Industry + Indicators ----
+            dbc.Row(
+                [
+                    dbc.Col(
+                        [
+                            html.Label("Industry"),
+                            dcc.Dropdown(
+                                id={"type": "industry-dropdown", "page": "indust"},
+                                options=data.industry_options,
+                                value=industry if industry in data.run.industry_slices else data.default_industry,
+                                clearable=False,
+                            ),
+                        ],
+                        width=1,
+                    ),
+
+                    dbc.Col(
+                        [
+                            html.Label("Indicators"),
+                            dcc.Dropdown(
+                                id={"type": "metrics-dropdown", "page": "indust"},
+                                options=indust_options,
+                                value=default_indust_metrics,
+                                multi=True,
+                            ),
+                        ],
+                        width=9,
+                    ),
+                ],
+                className="g-3",      # small gap between columns
+                justify="center",
+                style={"width": "80%", "margin": "0 auto", "marginBottom": "20px" },
+            ),
+            *resolution_selector("indust"),
+
+            # ---- Graph ----
+            dcc.Graph(
+                id={"type": graph_type("indust"), "page": "indust"},
+                style={"width": "100%", "height": "360px"}
+            ),
+
+            # ---- Download Button ----
+            *export_controls("indust"),
+            *graph_stores("indust"),
+        ])
+    ])
+
+
+def compare_body():
+    options = dataset().industry_options
+    return html.Div([
+        CenteredSection([
+            html.H2("Industry Comparison — Multi‑Industry Time Series"),
+
+            # --- Row: Indicator + Industries ---
+            dbc.Row(
+                [
+                    # Indicator column
+                    dbc.Col(
+                        [
+                            html.Label("Indicator"),
+                            dcc.Dropdown(
+                                id={"type": "metrics-dropdown", "page": "compare"},
+                                options=compare_metric_options,
+                                value="Total domestic production CVM",
+                                clearable=False,
+                            ),
+                        ],
+                        width=4,
+                    ),
+
+                    # Industries column
+                    dbc.Col(
+                        [
+                            html.Label("Industries"),
+                            dcc.Dropdown(
+                                id={"type": "industry-multi", "page": "compare"},
+                                options=options,
+                                value=[opt["value"] for opt in options[:5]],
+                                multi=True,
+                            ),
+                        ],
+                        width=7,
+                    ),
+                ],
+                className="g-3",
+                justify="center",
+                style={"width": "85%", "margin": "0 auto", "marginBottom": "10px"},
+            ),
+
+            # --- Row: pick the top/bottom N industries by the indicator ---
+            dbc.Row(
+                [
+                    dbc.Col(
+                        dcc.Dropdown(
+                            id="compare-pick",
+                            options=[
+                                {"label": "Choose industries", "value": "manual"},
+                                {"label": "Top N", "value": "top"},
+                                {"label": "Bottom N", "value": "bottom"},
+                            ],
+                            value="manual",
+                            clearable=False,
+                        ),
+                        width=3,
+                    ),
+                    dbc.Col(
+                        dbc.Input(id="compare-n", type="number", min=1, max=100, step=1, value=10),
+                        width=1,
+                    ),
+                    dbc.Col(
+                        dcc.Dropdown(
+                            id="compare-rank",
+                            options=[
+                                {"label": "by latest period", "value": "last"},
+                                {"label": "by average over the run", "value": "mean"},
+                            ],
+                            value="last",
+                            clearable=False,
+                        ),
+                        width=3,
+                    ),
+                ],
+                className="g-3",
+                justify="center",
+                style={"width": "85%", "margin": "0 auto", "marginBottom": "20px"},
+            ),
+            *run_selector("compare"),
+            *resolution_selector("compare"),
+
+            # --- Graph ---
+            dcc.Graph(
+                id={"type": graph_type("compare"), "page": "compare"},
+                style={"width": "100%", "height": "100%"}
+            ),
+
+            # --- Download button ---
+            *export_controls("compare"),
+            *graph_stores("compare"),
+        ])
+    ])
+
+
+def heatmap_body():
+    return html.Div([
+        CenteredSection([
+            html.H2("Industry Heatmap — All Industries × Periods"),
+
+            dbc.Row(
+                [
+                    dbc.Col(
+                        [
+                            html.Label("Indicator"),
+                            dcc.Dropdown(
+                                id="heatmap-metric",
+                                options=compare_metric_options,
+                                value="Total domestic production CVM",
+                                clearable=False,
+                            ),
+                        ],
+                        width=4,
+                    ),
+                    dbc.Col(
+                        [
+                            html.Label("Order industries by"),
+                            dcc.Dropdown(
+                                id="heatmap-order",
+                                options=[{"label": label, "value": key} for key, label in HEATMAP_ORDERS.items()],
+                                value="id",
+                                clearable=False,
+                            ),
+                        ],
+                        width=3,
+                    ),
+                    dbc.Col(
+                        [
+                            html.Label("Colour"),
+                            dcc.RadioItems(
+                                id="heatmap-scale",
+                                options=[
+                                    {"label": " Value", "value": "value"},
+                                    {"label": " Within industry (z-score)", "value": "row"},
+                                ],
+                                value="value",
+                                inline=True,
+                                inputStyle={"marginLeft": "10px"},
+                            ),
+                        ],
+                        width=4,
+                    ),
+                ],
+                className="g-3",
+                justify="center",
+                style={"width": "85%", "margin": "0 auto", "marginBottom": "10px"},
+            ),
+            dbc.Row(
+                resolution_controls("heatmap-resolution", "heatmap-transform"),
+                className="g-3",
+                justify="center",
+                style={"width": "85%", "margin": "0 auto", "marginBottom": "20px"},
+            ),
+
+            dcc.Graph(id="heatmap-graph", style={"width": "100%"}),
+            html.Small("Click a cell to open that industry.", className="text-muted"),
+        ])
+    ])
+
+
+def calibration_body():
+    return html.Div([
+        CenteredSection([
+            html.H2("Calibration — Simulated vs Observed"),
+            html.P(
+                f"{len(run_catalog.names())} runs scored against the observed series, "
+                "best (lowest mean MAPE) first. Click a column header to sort.",
+                className="text-muted",
+            ),
+            html.Div(dcc.Loading(
+                dash_table.DataTable(
+                    id="calibration-table",
+                    sort_action="native",
+                    sort_mode="single",
+                    merge_duplicate_headers=True,
+                    page_size=50,
+                    style_table={"overflowX": "auto"},
+                    style_cell={"padding": "4px 10px", "textAlign": "right"},
+                    style_cell_conditional=[{"if": {"column_id": "Run"}, "textAlign": "left"}],
+                ),
+                type="dot",
+            ), style={"width": "100%"}),
+            html.Small(
+                "RMSE and bias in £ billion; bias is simulated minus observed. "
+                "Periods without an observation are left out.",
+                className="text-muted",
+            ),
+        ])
+    ])
+
+# =========================================================
+# 7. LAYOUT + ROUTER
+# =========================================================
+
+app.layout = dbc.Container([
+        html.Div([
+            # Theme CSS link (switchable)
+            html.Link(id="theme-link", rel="stylesheet", href=dbc.themes.MINTY),
+
+            # App state + routing
+            dcc.Store(id="theme-store", data="light"),
+            dcc.Location(id="url", refresh="callback-nav"),  # callback-set hrefs navigate in place
+            # Re-routes once the background load finishes, then switches itself off
+            dcc.Interval(id="ready-poll", interval=READY_POLL_MS, disabled=False),
+            # Per-industry data bundle for client-side rendering (filled once per page load).
+            # In memory: a large run's bundle would not fit the ~5 MB sessionStorage quota
+            *([dcc.Store(id="client-bundle", storage_type="memory")] if CLIENTSIDE else []),
+            #
+            sticky_header(),
+            #
+            html.Div(
+                [
+                    # Collapsible Sidebar (left)
+                    sidebar(),
+                    # Content Area (right)
+                    html.Div(id="page-content", className="content-area")
+                ],
+                className="layout"
+            )
+        ])
+    ],
+    fluid=True,
+    className="dbc",
+    )
+
+
+
+def loading_body():
+    """Placeholder shown until the background load has finished (or failed)."""
+    if load_state["status"] == "error":
+        message = html.Div(f"Could not load the simulation output: {load_state['error']}", className="text-danger")
+    else:
+        message = html.Div([dbc.Spinner(size="sm", spinner_class_name="me-2"), "Loading simulation output…"])
+    return CenteredSection([message])
+
+
+@app.callback(
+    Output("page-content", "children"),
+    Output("ready-poll", "disabled"),
+    Input("url", "pathname"),
+    Input("url", "search"),
+    Input("ready-poll", "n_intervals"),
+)
+def router(path, search, _):
+    if not data_ready.is_set():
+        return loading_body(), load_state["status"] == "error"
+    if path and path.rstrip("/").endswith("/indust"):
+        # /indust?industry=N opens that industry (heatmap click-through)
+        industry = parse_qs((search or "").lstrip("?")).get("industry", [None])[0]
+        try:
+            industry = int(float(industry)) if industry is not None else None
+        except (ValueError, OverflowError):
+            industry = None
+        return indust_body(industry), True
+    if path and path.rstrip("/").endswith("/compare"):
+        return compare_body(), True
+    if path and path.rstrip("/").endswith("/heatmap"):
+        return heatmap_body(), True
+    if path and path.rstrip("/").endswith("/calibration"):
+        return calibration_body(), True
+    return macro_body(), True
+
+# Highlight active nav item
+@app.callback(
+    Output("nav-macro", "className"),
+    Output("nav-indust", "className"),
+    Output("nav-compare", "className"),
+    Output("nav-heatmap", "className"),
+    Output("nav-calibration", "className"),
+    Input("url", "pathname"),
+)
+def highlight_nav(pathname):
+    path = (pathname or "").rstrip("/")
+    def cls(active):
+        return "nav-item active" if active else "nav-item"
+    return (
+        cls(path.endswith("/macro") or path in ["", "/"]),
+        cls(path.endswith("/indust")),
+        cls(path.endswith("/compare")),
+        cls(path.endswith("/heatmap")),
+        cls(path.endswith("/calibration")),
+    )
+
+# =========================================================
+# 8. THEME TOGGLE
+# =========================================================
+
+@app.callback(
+    [Output("theme-link", "href"), Output("theme-store", "data")],
+    Input("theme-switch", "value")
+)
+def toggle_theme(is_dark):
+    return (dbc.themes.MINTY, "dark") if is_dark else (dbc.themes.MINTY, "light")
+
+
+@lru_cache(maxsize=None)
+def template_json(theme):
+    return pio.templates[figure_template(theme)].to_plotly_json()
+
+
+# Theme changes only patch the template and legend colours of the open graphs;
+# traces are neither rebuilt nor resent (draw_timeseries and draw_heatmap read
+# the theme as State).
+@app.callback(
+    Output({"type": "ts-graph", "page": ALL}, "figure", allow_duplicate=True),
+    Input("theme-store", "data"),
+    State({"type": "ts-graph", "page": ALL}, "id"),
+    prevent_initial_call=True,
+)
+def retheme_figures(theme, graph_ids):
+    legend_bg, legend_border = legend_colors(theme)
+    patches = []
+    for _ in graph_ids:
+        patched = Patch()
+        patched["layout"]["template"] = template_json(theme)
+        patched["layout"]["legend"]["bgcolor"] = legend_bg
+        patched["layout"]["legend"]["bordercolor"] = legend_border
+        patches.append(patched)
+    return patches
+
+
+# The heatmap has no legend and is on its own page, so it gets the template only
+@app.callback(
+    Output("heatmap-graph", "figure", allow_duplicate=True),
+    Input("theme-store", "data"),
+    prevent_initial_call=True,
+)
+def retheme_heatmap(theme):
+    patched = Patch()
+    patched["layout"]["template"] = template_json(theme)
+    return patched
+
+# =========================================================
+# 9. UNIFIED FIGURE CALLBACK
+# =========================================================
+
+# Finished figures are memoized on the normalized callback inputs plus the
+# data version; every publish_dataset() empties the cache.
+FIGURE_CACHE_SIZE = int(os.environ.get("ABEM_FIGURE_CACHE_SIZE", 256))
+
+
+def ordered_metrics(selected, metrics):
+    """Known selected columns as a tuple in the order they were selected (the cache key form), without repeats."""
+    if isinstance(selected, str):
+        selected = [selected]
+    known = set(metrics.values())
+    return tuple(col for col in dict.fromkeys(selected or []) if col in known)
+
+
+def window_slice(x, window):
+    """Slice of the sorted periods x covering window=(x0, x1) plus one point either side."""
+    lo = max(np.searchsorted(x, window[0], side="left") - 1, 0)
+    return slice(lo, np.searchsorted(x, window[1], side="right") + 1)
+
+
+def figure_series(page, metrics, industries, runs=None, resolution=None, since=None, window=None):
+    """
+    [(trace name, x, y), ...] behind a normalized view, in trace order.
+    Several runs are overlaid run by run, with the run name in the trace name.
+    `resolution=(level, transform)` other than every period's value reads the
+    period pyramid instead (see resolve_resolution). With `since`, only
+    periods after it (used by the live tail, every-period values only); with
+    `window=(x0, x1)`, only that period range plus one point either side.
+    """
+    runs = runs or (DEFAULT_RUN,)
+    width, transform = resolve_resolution(runs, resolution, window)
+    if (width, transform) != (1, "value"):
+        return pyramid_series(page, metrics, industries, runs, width, transform, window)
+    sources = []
+    series = []
+    for run_name in runs:
+        run = run_catalog.get(run_name)
+        tag = f" [{run_name}]" if len(runs) > 1 else ""
+        if page == "macro":
+            sources += [(run_name, f"{col}{tag} ({metric_unit(col)})", run.macro_df, col)
+                        for col in metrics if col in run.macro_df.columns]
+        elif page == "indust":
+            dff = industry_frame(industries[0], run, metrics, window)
+            sources += [(run_name, f"{col}{tag} ({metric_unit(col)})", dff, col) for col in metrics if col in dff.columns]
+        elif metrics[0] in run.df.columns:
+            series += pivot_series(run_name, metrics[0], industries, tag, since, window)
+
+    for run_name, name, dff, col in sources:
+        if since is not None:
+            # Only the default run grows (live tail); catalog runs are fixed
+            dff = dff[dff["Period"] > since] if run_name == DEFAULT_RUN else dff.iloc[0:0]
+        if window is not None:
+            dff = dff.iloc[window_slice(dff["Period"].to_numpy(), window)]
+        series.append((name, dff["Period"], dff[col]))
+    return series
+
+
+def pyramid_series(page, metrics, industries, runs, width, transform, window=None):
+    """figure_series at one pyramid level: each trace is a row of that level's `transform` matrix."""
+    rows = []
+    for run_name in runs:
+        run = run_catalog.get(run_name)
+        tag = f" [{run_name}]" if len(runs) > 1 else ""
+        if page == "macro":
+            for col in metrics:
+                if col in run.macro_df.columns:
+                    level = macro_pyramid(run_name, col, dataset().version)[width]
+                    rows.append((f"{col}{tag} ({metric_unit(col)})", col, level, 0))
+            continue
+        for col in (metrics if page == "indust" else metrics[:1]):
+            if col not in run.df.columns:
+                continue
+            inds, levels = selected_pyramid(run_name, col, industries)
+            for ind, p in zip(industries, np.searchsorted(inds, industries)):
+                if p < len(inds) and inds[p] == ind:
+                    name = f"{col}{tag} ({metric_unit(col)})" if page == "indust" else f"Industry {ind}{tag}"
+                    rows.append((name, col, levels[width], p))
+
+    series = []
+    for name, col, level, p in rows:
+        cols = window_slice(level.periods, window) if window is not None else slice(None)
+        y = getattr(level, transform)[p, cols]
+        series.append((name, level.periods[cols], pd.Series(y, name=col, copy=False)))
+    return series
+
+
+def pivot_series(run_name, metric, industries, tag="", since=None, window=None):
+    """
+    Comparison traces of one run from a single pivot lookup: every industry's
+    y is a row of the metric's (industries x periods) matrix, sharing one x.
+    """
+    pivot = selected_pivot(run_name, metric, industries, window)
+    x = pivot.periods
+    cols = slice(None)
+    if since is not None:
+        # Only the default run grows (live tail); catalog runs are fixed
+        cols = slice(np.searchsorted(x, since, side="right") if run_name == DEFAULT_RUN else len(x), None)
+    if window is not None:
+        cols = window_slice(x, window)
+    pos = np.searchsorted(pivot.industries, industries)
+    return [
+        (f"Industry {ind}{tag}", x[cols], pd.Series(pivot.values[p, cols], name=metric, copy=False))
+        for ind, p in zip(industries, pos) if p < len(pivot.industries) and pivot.industries[p] == ind
+    ]
+
+
+def rank_industries(metric, n, stat="last", largest=True, run_name=None):
+    """
+    The n industries with the largest (or smallest) latest/average value of
+    metric, best first. A partial sort (argpartition) over the pivot picks
+    them without ordering every industry.
+    """
+    pivot = industry_pivot(run_name or DEFAULT_RUN, metric, dataset().version)
+    with np.errstate(all="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN rows
+        key = last_valid(pivot.values) if stat == "last" else np.nanmean(pivot.values, axis=1)
+    key = np.where(np.isnan(key), -np.inf, key if largest else -key)  # industries without data last
+    n = max(0, min(int(n), len(key)))
+    if n == 0:
+        return []
+    top = np.argpartition(-key, n - 1)[:n]
+    top = top[np.argsort(-key[top], kind="stable")]
+    return [int(i) for i in pivot.industries[top]]
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: indices of n_out points that keep the
+    visual shape of (x, y). First and last points are always kept.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    idx = np.empty(n_out, dtype=int)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = hi, (edges[i + 2] if i + 2 < len(edges) else n)
+        avg_x, avg_y = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        idx[i + 1] = a
+    return idx
+
+
+def downsample(x, y, max_points=None):
+    """(x, y, reduced): series longer than max_points come back LTTB-downsampled."""
+    max_points = MAX_POINTS if max_points is None else max_points
+    if len(x) <= max_points:
+        return x, y, False
+    xv = np.asarray(x, dtype="float64")
+    yv = np.asarray(y, dtype="float64")
+    ok = ~(np.isnan(xv) | np.isnan(yv))
+    xv, yv = xv[ok], yv[ok]
+    keep = lttb_indices(xv, yv, max_points)
+    return xv[keep], yv[keep], True
+
+
+def compact_array(values, integers=False, decimals=HOVER_DECIMALS):
+    """
+    Array in the smallest dtype that displays the same: int32 when
+    `integers` and every value is integral (periods), float32 when it is
+    within half the last shown decimal, otherwise unchanged. Plotly sends it
+    as a typed binary array. extendTraces keeps that type for points appended
+    in the browser, hence int32 rather than int16 and no integers by default.
+    """
+    if values is None:
+        return values
+    a = np.asarray(values)
+    if integers and a.dtype.kind in "iu" and a.size and np.abs(a).max() < 2 ** 31:
+        return a.astype(np.int32)
+    if a.dtype.kind != "f" or a.size == 0:
+        return values
+    finite = a[np.isfinite(a)]
+    if integers and finite.size == a.size and np.array_equal(a, np.round(a)) and np.abs(a).max() < 2 ** 31:
+        return a.astype(np.int32)
+    if a.dtype != np.float32:
+        with np.errstate(over="ignore", invalid="ignore"):
+            a32 = a.astype(np.float32)
+            err = np.abs(finite.astype(np.float32).astype(np.float64) - finite).max(initial=0.0)
+        if err < 0.5 * 10.0 ** -decimals:
+            return a32
+    return values
+
+
+def typed_array(values):
+    """
+    compact_array(values) in Plotly's JSON typed-array form, {"dtype", "bdata"}
+    with the little-endian bytes in base64, which plotly.js reads as is. For
+    arrays that do not go through a figure (the client bundle).
+    """
+    a = np.asarray(compact_array(np.asarray(values, dtype="float64")))
+    a = a.astype(a.dtype.newbyteorder("<"), copy=False)
+    return {"dtype": a.dtype.str[1:], "bdata": base64.b64encode(a.tobytes()).decode("ascii")}
+
+
+def normalize_resolution(level=None, transform=None):
+    """(level, transform) from the selectors: a PERIOD_LEVELS width or "auto", and a SERIES_TRANSFORMS key."""
+    return (level if level in PERIOD_LEVELS else "auto",
+            transform if transform in SERIES_TRANSFORMS else "value")
+
+
+def resolve_resolution(runs, resolution=None, window=None):
+    """
+    (width, transform) actually drawn. "auto" is the finest level whose
+    buckets over the visible window (all periods when None) fit in
+    MAX_POINTS per trace, sized on the longest run.
+    """
+    level, transform = resolution or (1, "value")
+    if level != "auto":
+        return level, transform
+    n = 0
+    for run_name in runs:
+        p = run_catalog.get(run_name).macro_df["Period"].to_numpy()
+        n = max(n, len(p) if window is None else int(((p >= window[0]) & (p <= window[1])).sum()))
+    return next((w for w in PERIOD_LEVELS if n / w <= MAX_POINTS), PERIOD_LEVELS[-1]), transform
+
+
+def period_axis_title(width, transform):
+    """x-axis title naming the resolution drawn."""
+    every = f"every {width} periods" if width > 1 else ""
+    if transform == "rolling":
+        detail = ", ".join(filter(None, [f"rolling {ROLLING_PERIODS}-period mean", every]))
+    elif transform == "cumulative":
+        detail = ", ".join(filter(None, ["cumulative sum", every]))
+    else:
+        detail = f"{width}-period means" if width > 1 else ""
+    return f"Period ({detail})" if detail else "Period"
+
+
+def view_is_downsampled(page, metrics, industries, runs, resolution=None):
+    """True when the full view is reduced (LTTB or an Auto level above 1), so zooming in can show more."""
+    if resolution and resolution[0] == "auto" and resolve_resolution(runs, resolution)[0] > 1:
+        return True
+    return any(len(x) > MAX_POINTS for _, x, _ in figure_series(page, metrics, industries, runs, resolution))
+
+
+@lru_cache(maxsize=FIGURE_CACHE_SIZE)
+def build_figure(page, metrics, industries, runs, resolution, theme, version):
+    """
+    Figure dict for one normalized view. `version` is only part of the cache
+    key, so figures built from older data are never served.
+    """
+    template = figure_template(theme)
+
+    with phase("data"):
+        series = [(name, metric_unit(y.name), *downsample(x, y))
+                  for name, x, y in figure_series(page, metrics, industries, runs, resolution)]
+
+    fig = go.Figure()
+    with phase("traces"):
+        for name, unit, x, y, reduced in series:
+            if reduced:
+                fig.add_trace(go.Scattergl(x=x, y=y, mode="lines", name=name, meta=unit))
+            elif page == "compare":
+                fig.add_trace(go.Bar(x=x, y=y, name=name, meta=unit))
+            else:
+                fig.add_trace(go.Scatter(x=x, y=y, mode="lines+markers", name=name, meta=unit))
+
+    # ----- Macro -----
+    if page == "macro":
+        fig.update_layout(title="Macroeconomic Indicators Over Time", xaxis_title="Period")
+
+    # ----- Micro -----
+    elif page == "indust":
+        fig.update_layout(title=f"Industry-{industries[0]} Indicators Over Time", xaxis_title="Period")
+
+    # ----- Comparison -----
+    else:
+        fig.update_layout(
+            barmode="group",
+            title=f"Comparison — {metrics[0]} across Industries",
+            xaxis_title="Period"
+        )
+
+    with phase("format"):
+        fig = format_currency_axis(fig, template, theme)
+        fig.update_xaxes(title=period_axis_title(*resolve_resolution(runs, resolution)))
+    with phase("to_dict"):
+        for tr in fig.data:
+            x, y = compact_array(tr.x, integers=True), compact_array(tr.y)
+            tr.x = tr.y = None  # assigning onto an existing array would keep its dtype
+            tr.x, tr.y = x, y
+        return fig.to_dict()
+
+
+def clear_data_caches():
+    """Empties every cache keyed by the data version (called by publish_dataset)."""
+    build_figure.cache_clear()
+    build_heatmap.cache_clear()
+    industry_pyramid.cache_clear()
+    macro_pyramid.cache_clear()
+    industry_pivot.cache_clear()
+    pivot_index.cache_clear()
+
+
+def data_changed():
+    """Publishes the current data again under a new version, with empty caches (cold benchmark timings)."""
+    data = _dataset
+    return publish_dataset(data.run, data.file_paths, data.files)
+
+
+def figure_cache_stats():
+    info = build_figure.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize,
+            "version": dataset().version}
+
+
+def selected_runs(run_sel):
+    """Runs picked in a page's run dropdown (ALL-pattern value list), default run if none."""
+    chosen = run_sel[0] if run_sel and run_sel[0] else []
+    if isinstance(chosen, str):
+        chosen = [chosen]
+    known = set(run_catalog.names())
+    return tuple(r for r in dict.fromkeys(chosen) if r in known) or (DEFAULT_RUN,)
+
+
+def normalize_view(metrics_selected, indust_ind, compare_ind, pathname, run_sel=None, level=None, transform=None):
+    """(page, metrics, industries, runs, resolution) for the callback inputs, or None off-page."""
+    path = (pathname or "").rstrip("/")
+    runs = selected_runs(run_sel)
+    resolution = normalize_resolution(level, transform)
+
+    # ----- Macro -----
+    if path.endswith("/macro") or path in ["", "/"]:
+        return "macro", ordered_metrics(metrics_selected, MACRO_METRICS), (), runs, resolution
+
+    # ----- Micro -----
+    if path.endswith("/indust"):
+        metrics = ordered_metrics(metrics_selected, INDUST_METRICS)
+        industry = indust_ind[0] if (indust_ind and indust_ind[0]) else dataset().default_industry
+        return "indust", metrics, (industry,), (DEFAULT_RUN,), resolution
+
+    # ----- Comparison -----
+    if path.endswith("/compare"):
+        metric = metrics_selected
+        if isinstance(metric, list):
+            metric = metric[0] if metric else "Total domestic production"
+
+        inds = compare_ind[0] if (compare_ind and compare_ind[0]) else []
+        if isinstance(inds, int):
+            inds = [inds]
+        return "compare", (metric,), tuple(sorted(set(inds))), runs, resolution
+    return None
+
+
+def last_period():
+    macro = dataset().run.macro_df
+    return int(macro["Period"].max()) if len(macro) else None
+
+
+@app.callback(
+    Output({"type": "ts-graph", "page": MATCH}, "figure"),
+    Output({"type": "tail-store", "page": MATCH}, "data"),
+    [
+        Input({"type": "metrics-dropdown", "page": MATCH}, "value"),
+        Input({"type": "industry-dropdown", "page": ALL}, "value"),
+        Input({"type": "industry-multi", "page": ALL}, "value"),
+        Input({"type": "run-multi", "page": ALL}, "value"),
+        Input("url", "pathname"),
+        Input({"type": "resolution", "page": MATCH}, "value"),
+        Input({"type": "transform", "page": MATCH}, "value"),
+    ],
+    State("theme-store", "data"),
+)
+def draw_timeseries(metrics_selected, indust_ind, compare_ind, run_sel, pathname, level, transform, theme):
+    view = normalize_view(metrics_selected, indust_ind, compare_ind, pathname, run_sel, level, transform)
+    if view is None:
+        return no_update, no_update
+    # The tail store remembers the last period drawn, so the live tail only extends past it
+    return build_figure(*view, theme, dataset().version), {"period": last_period()}
+
+# ----- Top/bottom N: fills the industry picker from a partial sort over the pivot -----
+@app.callback(
+    Output({"type": "industry-multi", "page": "compare"}, "value"),
+    Input("compare-pick", "value"),
+    Input("compare-n", "value"),
+    Input("compare-rank", "value"),
+    Input({"type": "metrics-dropdown", "page": "compare"}, "value"),
+    prevent_initial_call=True,
+)
+def pick_compare_industries(pick, n, stat, metric):
+    if pick not in ("top", "bottom") or not n or not metric:
+        return no_update
+    metric = metric[0] if isinstance(metric, list) else metric
+    return rank_industries(metric, n, stat, largest=(pick == "top"))
+
+
+# ----- Zoom: full resolution (or the Auto level) for the visible window -----
+# relayoutData also fires for the legend auto-hide, so a clientside callback
+# keeps only x-range changes and the server sees nothing else.
+app.clientside_callback(
+    """
+    function(relayout) {
+        var no_update = window.dash_clientside.no_update;
+        if (!relayout) { return no_update; }
+        if (relayout["xaxis.autorange"]) { return {range: null}; }
+        var r = relayout["xaxis.range"];
+        if (!r && ("xaxis.range[0]" in relayout)) {
+            r = [relayout["xaxis.range[0]"], relayout["xaxis.range[1]"]];
+        }
+        return r ? {range: r} : no_update;
+    }
+    """,
+    Output({"type": "zoom-store", "page": MATCH}, "data"),
+    Input({"type": "ts-graph", "page": MATCH}, "relayoutData"),
+    prevent_initial_call=True,
+)
+
+
+@app.callback(
+    Output({"type": "ts-graph", "page": MATCH}, "figure", allow_duplicate=True),
+    Input({"type": "zoom-store", "page": MATCH}, "data"),
+    [
+        State({"type": "metrics-dropdown", "page": MATCH}, "value"),
+        State({"type": "industry-dropdown", "page": ALL}, "value"),
+        State({"type": "industry-multi", "page": ALL}, "value"),
+        State({"type": "run-multi", "page": ALL}, "value"),
+        State("url", "pathname"),
+        State({"type": "resolution", "page": MATCH}, "value"),
+        State({"type": "transform", "page": MATCH}, "value"),
+    ],
+    prevent_initial_call=True,
+)
+def zoom_timeseries(zoom, metrics_selected, indust_ind, compare_ind, run_sel, pathname, level, transform):
+    view = normalize_view(metrics_selected, indust_ind, compare_ind, pathname, run_sel, level, transform)
+    if view is None or not zoom or not view_is_downsampled(*view):
+        return no_update
+    window = None
+    if zoom.get("range"):
+        window = tuple(float(v) for v in zoom["range"])
+
+    patched = Patch()
+    # Auto picks its level again for the visible window
+    patched["layout"]["xaxis"]["title"]["text"] = period_axis_title(*resolve_resolution(view[3], view[4], window))
+    for i, (_, x, y) in enumerate(figure_series(*view, window=window)):
+        scale = display_scale(y.name)  # same scaling as format_currency_axis
+        x, y, _ = downsample(x, y)
+        patched["data"][i]["x"] = compact_array(np.asarray(x), integers=True)
+        patched["data"][i]["y"] = compact_array(np.asarray(y, dtype="float64") * scale)
+    return patched
+
+# =========================================================
+# 10. CLIENT-SIDE RENDERING
+# =========================================================
+# Only registered with ABEM_CLIENTSIDE=1. The browser receives every industry's
+# INDUST_METRICS series once (already in £bn or %) and builds the /indust and
+# /compare figures itself, so dropdown changes never reach the server.
+
+@lru_cache(maxsize=1)
+def build_client_bundle(key):
+    """
+    {"key", "periods", "metrics", "units", "industries", "default_industry",
+    "templates", "legend", "dtick_max_periods"}.
+    An industry whose periods equal the shared "periods" list sends x as null;
+    its metric values are typed_array()s (about 5 bytes a value, not 11 as
+    JSON numbers). `key` is the data_key() of the data, so the bundle held by
+    the page stays valid across workers and restarts until the files change.
+    """
+    data = dataset()
+    columns = [c for c in dict.fromkeys(INDUST_METRICS.values()) if c in data.run.df.columns]
+    periods = sorted(int(p) for p in data.run.df["Period"].dropna().unique())
+    industries = {}
+    for ind in data.run.industry_slices:
+        dff = industry_frame(ind, data.run)
+        x = dff["Period"].astype(int).tolist()
+        entry = {"x": None if x == periods else x}
+        for col in columns:
+            entry[col] = typed_array(dff[col].to_numpy("float64") * display_scale(col))
+        industries[str(ind)] = entry
+    return {
+        "key": key,
+        "periods": periods,
+        "metrics": {col: label for label, col in INDUST_METRICS.items() if col in columns},
+        "units": {col: metric_unit(col) for col in columns},
+        "industries": industries,
+        "default_industry": data.default_industry,
+        "templates": {t: template_json(t) for t in ("light", "dark")},
+        "legend": {t: legend_colors(t) for t in ("light", "dark")},
+        "dtick_max_periods": DTICK_MAX_PERIODS,
+    }
+
+
+if CLIENTSIDE:
+
+    @app.callback(
+        Output("client-bundle", "data"),
+        Input("url", "pathname"),
+        Input("ready-poll", "disabled"),
+        State("client-bundle", "data"),
+    )
+    def load_client_bundle(pathname, _, current):
+        path = (pathname or "").rstrip("/")
+        if not data_ready.is_set() or not any(path.endswith("/" + page) for page in CLIENTSIDE_PAGES):
+            return no_update
+        key = dataset().key
+        if current and current.get("key") == key:
+            return no_update
+        return build_client_bundle(key)
+
+    app.clientside_callback(
+        ClientsideFunction(namespace="abem", function_name="draw_timeseries"),
+        Output({"type": "cs-graph", "page": MATCH}, "figure"),
+        [
+            Input({"type": "metrics-dropdown", "page": MATCH}, "value"),
+            Input({"type": "industry-dropdown", "page": ALL}, "value"),
+            Input({"type": "industry-multi", "page": ALL}, "value"),
+            Input("url", "pathname"),
+            Input("theme-store", "data"),
+            Input("client-bundle", "data"),
+        ],
+    )
+
+# =========================================================
+# 11. LIVE TAIL
+# =========================================================
+# Only registered with ABEM_LIVE_TAIL=1. Each page's dcc.Interval polls for new
+# period files; open graphs receive just the new points through extendData.
+
+if LIVE_TAIL:
+
+    @app.callback(
+        Output({"type": "ts-graph", "page": MATCH}, "extendData"),
+        Output({"type": "ts-graph", "page": MATCH}, "figure", allow_duplicate=True),
+        Output({"type": "tail-store", "page": MATCH}, "data", allow_duplicate=True),
+        Output({"type": "tail-latency", "page": MATCH}, "data"),
+        Input({"type": "tail-interval", "page": MATCH}, "n_intervals"),
+        [
+            State({"type": "metrics-dropdown", "page": MATCH}, "value"),
+            State({"type": "industry-dropdown", "page": ALL}, "value"),
+            State({"type": "industry-multi", "page": ALL}, "value"),
+            State({"type": "run-multi", "page": ALL}, "value"),
+            State("url", "pathname"),
+            State({"type": "resolution", "page": MATCH}, "value"),
+            State({"type": "transform", "page": MATCH}, "value"),
+            State({"type": "tail-store", "page": MATCH}, "data"),
+            State("theme-store", "data"),
+        ],
+        prevent_initial_call=True,
+    )
+    def tail_timeseries(n, metrics_selected, indust_ind, compare_ind, run_sel, pathname, level, transform, tail, theme):
+        if ingest_new_periods():
+            pin_dataset()  # read the periods just published
+        since = (tail or {}).get("period")
+        latest = last_period()
+        view = normalize_view(metrics_selected, indust_ind, compare_ind, pathname, run_sel, level, transform)
+        if view is None or since is None or latest is None or latest <= since:
+            return no_update, no_update, no_update, no_update
+
+        latency = {"period": latest, "landed": period_landed.get(latest), "sent": time.time()}
+        if resolve_resolution(view[3], view[4]) != (1, "value"):
+            # Coarser levels and transforms change points already drawn: redraw instead
+            return no_update, build_figure(*view, theme, dataset().version), {"period": latest}, latency
+        series = figure_series(*view, since=since)
+        if not series:
+            return no_update, no_update, {"period": latest}, no_update
+        # Same scaling as format_currency_axis: £bn (or %) on the axis and in the hover
+        ys = [(y * display_scale(y.name)).tolist() for _, _, y in series]
+        update = {"x": [x.tolist() for _, x, _ in series], "y": ys}
+        return [update, list(range(len(series)))], no_update, {"period": latest}, latency
+
+    # Disk-to-browser latency, measured in the browser when the points arrive
+    app.clientside_callback(
+        """
+        function(info) {
+            if (!info || !info.landed) { return window.dash_clientside.no_update; }
+            var now = Date.now() / 1000;
+            return "Period " + info.period + " shown " + (now - info.landed).toFixed(2) +
+                   " s after its file landed (server side " + (info.sent - info.landed).toFixed(2) + " s)";
+        }
+        """,
+        Output({"type": "tail-status", "page": MATCH}, "children"),
+        Input({"type": "tail-latency", "page": MATCH}, "data"),
     )
 
 # =========================================================
-# 6. PAGE BODIES
+# 12. HEATMAP
 # =========================================================
+# One cell per (industry, period) from the dense pivot, or per bucket of periods
+# from its pyramid, so the figure is a single Heatmap trace whatever the number
+# of industries.
 
-macro_body = html.Div([
-    CenteredSection([
-        html.H2("Macroeconomic Time Series"),
-        dbc.Row([
-            dbc.Col([
-                html.Label("Indicators"),
-                dcc.Dropdown(
-                    id={"type": "metrics-dropdown", "page": "macro"},
-                    options=macro_options,
-                    value=["Observed domestic production CVM", "Total domestic production CVM"],
-                    multi=True,
-                )],
-                width = 8,
-                ),
-            ],
-            className="g-3",
-            justify="center",
-            style={"width": "80%", "margin": "0 auto", "marginBottom": "20px"},
-        ),
-        dcc.Graph(id={"type": "ts-graph", "page": "macro"}, style={"width": "100%", "height": "520px"}),
-        html.Button("Download CSV", id={"type": "download-btn", "page": "macro"}, className="btn btn-outline-primary mt-2"),
-        dcc.Download(id={"type": "download", "page": "macro"})
-    ])
-])
+HEATMAP_ORDERS = {
+    "id": "Industry ID",
+    "mean": "Average (highest first)",
+    "last": "Latest period (highest first)",
+    "growth": "Change first → last period",
+    "cluster": "Similar trajectories (clustered)",
+}
 
 
-indust_body = html.Div([
-    CenteredSection([
-        html.H2("Microeconomic Time Series"),
+def heatmap_row_order(matrix, order):
+    """Row permutation of an (industries x periods) matrix for one HEATMAP_ORDERS key."""
+    n = matrix.shape[0]
+    if order == "id" or n < 2:
+        return np.arange(n)
+    with np.errstate(all="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN rows
+        if order == "mean":
+            key = np.nanmean(matrix, axis=1)
+        elif order == "last":
+            key = last_valid(matrix)
+        elif order == "growth":
+            filled = pd.DataFrame(matrix).ffill(axis=1).bfill(axis=1).to_numpy()
+            key = filled[:, -1] - filled[:, 0]
+        else:
+            # Spectral seriation: rows sorted along the first principal component of
+            # their standardized trajectories, which places similar shapes together
+            z = (matrix - np.nanmean(matrix, axis=1, keepdims=True)) / np.nanstd(matrix, axis=1, keepdims=True)
+            z = np.nan_to_num(z)
+            u, s, _ = np.linalg.svd(z - z.mean(axis=0), full_matrices=False)
+            key = -(u[:, 0] * s[0])
+    if order == "cluster":
+        return np.argsort(key, kind="stable")
+    # Highest first; rows without data go last
+    return np.argsort(np.where(np.isnan(key), -np.inf, key), kind="stable")[::-1]
 
-        # ---- Row for Industry + Indicators ----
-        dbc.Row(
-            [
-                dbc.Col(
-                    [
-                        html.Label("Industry"),
-                        dcc.Dropdown(
-                            id={"type": "industry-dropdown", "page": "indust"},
-                            options=industry_options,
-                            value=default_industry,
-                            clearable=False,
-                        ),
-                    ],
-                    width=1,
-                ),
 
-                dbc.Col(
-                    [
-                        html.Label("Indicators"),
-                        dcc.Dropdown(
-                            id={"type": "metrics-dropdown", "page": "indust"},
-                            options=indust_options,
-                            value=default_indust_metrics,
-                            multi=True,
-                        ),
-                    ],
-                    width=9,
-                ),
-            ],
-            className="g-3",      # small gap between columns
-            justify="center",
-            style={"width": "80%", "margin": "0 auto", "marginBottom": "20px" },
-        ),
+@lru_cache(maxsize=FIGURE_CACHE_SIZE)
+def build_heatmap(metric, order, scale, resolution, theme, version):
+    width, transform = resolve_resolution((DEFAULT_RUN,), resolution)
+    industries, levels = industry_pyramid(DEFAULT_RUN, metric, version)
+    periods, matrix = levels[width].periods, getattr(levels[width], transform)
+    rows = heatmap_row_order(matrix, order)
+    z = matrix[rows]
+    if scale == "row":
+        with np.errstate(all="ignore"), warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            z = (z - np.nanmean(z, axis=1, keepdims=True)) / np.nanstd(z, axis=1, keepdims=True)
+        colorbar, hover = "z-score", "%{z:.2f}"
+    elif metric_unit(metric) == "%":
+        colorbar, hover = "%", "%{z:,.2f}%"
+    else:
+        z = z * display_scale(metric)
+        colorbar, hover = "£ billion", "£%{z:,.2f} bn"
 
-        # ---- Graph ----
-        dcc.Graph(
-            id={"type": "ts-graph", "page": "indust"},
-            style={"width": "100%", "height": "360px"}
-        ),
+    labels = [str(int(i)) for i in industries[rows]]
+    fig = go.Figure(go.Heatmap(
+        z=compact_array(z),
+        x=periods,
+        y=labels,
+        colorscale="RdBu_r" if scale == "row" or metric_unit(metric) == "%" else "Viridis",
+        zmid=0 if scale == "row" else None,
+        colorbar=dict(title=colorbar),
+        hovertemplate="Industry %{y}<br>Period %{x}<br>" + hover + "<extra></extra>",
+        hoverongaps=False,
+    ))
+    label = next((k for k, v in INDUST_METRICS.items() if v == metric), metric)
+    fig.update_layout(
+        template=figure_template(theme),
+        title=dict(text=f"{label} — {len(labels)} industries × {len(periods)} periods", x=0.5),
+        height=int(min(max(420, 14 * len(labels) + 120), 1400)),
+        margin=dict(l=60, r=40, t=60, b=50),
+        uirevision="static",
+    )
+    fig.update_xaxes(title=period_axis_title(width, transform), tickformat=".0f")
+    fig.update_yaxes(title="Industry", type="category", autorange="reversed", showticklabels=len(labels) <= 80)
+    return fig.to_dict()
 
-        # ---- Download Button ----
-        html.Button(
-            "Download CSV",
-            id={"type": "download-btn", "page": "indust"},
-            className="btn btn-outline-primary mt-2"
-        ),
-        dcc.Download(id={"type": "download", "page": "indust"})
-    ])
-])
 
+@app.callback(
+    Output("heatmap-graph", "figure"),
+    Input("heatmap-metric", "value"),
+    Input("heatmap-order", "value"),
+    Input("heatmap-scale", "value"),
+    Input("heatmap-resolution", "value"),
+    Input("heatmap-transform", "value"),
+    State("theme-store", "data"),
+)
+def draw_heatmap(metric, order, scale, level, transform, theme):
+    return build_heatmap(metric, order, scale, normalize_resolution(level, transform), theme, dataset().version)
 
-compare_body = html.Div([
-    CenteredSection([
-        html.H2("Industry Comparison — Multi‑Industry Time Series"),
 
-        # --- Row: Indicator + Industries ---
-        dbc.Row(
-            [
-                # Indicator column
-                dbc.Col(
-                    [
-                        html.Label("Indicator"),
-                        dcc.Dropdown(
-                            id={"type": "metrics-dropdown", "page": "compare"},
-                            options=compare_metric_options,
-                            value="Total domestic production CVM",
-                            clearable=False,
-                        ),
-                    ],
-                    width=4,
-                ),
+# A click opens that industry on /indust, without a server round trip
+app.clientside_callback(
+    """
+    function(click, pathname) {
+        if (!click || !click.points || !click.points.length) {
+            return window.dash_clientside.no_update;
+        }
+        var base = (pathname || "").replace(/\\/+$/, "").replace(/\\/heatmap$/, "");
+        return base + "/indust?industry=" + encodeURIComponent(click.points[0].y);
+    }
+    """,
+    Output("url", "href"),
+    Input("heatmap-graph", "clickData"),
+    State("url", "pathname"),
+    prevent_initial_call=True,
+)
 
-                # Industries column
-                dbc.Col(
-                    [
-                        html.Label("Industries"),
-                        dcc.Dropdown(
-                            id={"type": "industry-multi", "page": "compare"},
-                            options=industry_options,
-                            value=[opt["value"] for opt in industry_options[:5]],
-                            multi=True,
-                        ),
-                    ],
-                    width=7,
-                ),
-            ],
-            className="g-3",
-            justify="center",
-            style={"width": "85%", "margin": "0 auto", "marginBottom": "20px"},
-        ),
+# =========================================================
+# 13. CALIBRATION
+# =========================================================
+# Runs are scored on the CALIBRATION_TARGETS: simulated macro totals and the
+# observed series are joined on Period, and RMSE, MAPE and bias are computed
+# for every run and target in one pass over a (runs x periods x targets) array.
 
-        # --- Graph ---
-        dcc.Graph(
-            id={"type": "ts-graph", "page": "compare"},
-            style={"width": "100%", "height": "100%"}
-        ),
+CALIBRATION_STATS = {"rmse": "RMSE", "mape": "MAPE (%)", "bias": "Bias", "n": "Periods"}
 
-        # --- Download button ---
-        html.Button(
-            "Download CSV",
-            id={"type": "download-btn", "page": "compare"},
-            className="btn btn-outline-primary mt-2"
-        ),
-        dcc.Download(id={"type": "download", "page": "compare"}),
-    ])
-])
 
-# =========================================================
-# 7. LAYOUT + ROUTER
-# =========================================================
+@lru_cache(maxsize=1024)
+def calibration_arrays(run_name, key):
+    """Simulated and observed CALIBRATION_TARGETS of one run joined on Period, as two (periods x targets) arrays."""
+    run = run_catalog.loaded(run_name)
+    if run is None:
+        # Read directly rather than through the catalog, so scoring a whole
+        # sweep does not evict the runs open in the pages
+        run = load_run(run_catalog.runs[run_name])
+    periods = run.macro_df["Period"].to_numpy()
+    observed = observed_by_period(run.economy_wide_df, periods)
+    obs = observed.reindex(index=periods, columns=list(CALIBRATION_TARGETS)).to_numpy(dtype="float64")
+    sim = run.macro_df.reindex(columns=list(CALIBRATION_TARGETS.values())).to_numpy(dtype="float64")
+    return sim, obs
 
-app.layout = dbc.Container([
-        html.Div([
-            # Theme CSS link (switchable)
-            html.Link(id="theme-link", rel="stylesheet", href=dbc.themes.MINTY),
 
-            # App state + routing
-            dcc.Store(id="theme-store", data="light"),
-            dcc.Location(id="url"),
-            #
-            sticky_header(),
-            #
-            html.Div(
-                [
-                    # Collapsible Sidebar (left)
-                    sidebar(),
-                    # Content Area (right)
-                    html.Div(id="page-content", className="content-area")
-                ],
-                className="layout"
-            )
-        ])
-    ],
-    fluid=True,
-    className="dbc",
-    )
+def run_calibration_arrays(run_name):
+    # Keyed on the run's data_key(), so scores follow the files across reloads
+    try:
+        return calibration_arrays(run_name, run_catalog.key(run_name))
+    except (OSError, ValueError, KeyError) as exc:
+        print(f"[calibration] cannot score {run_name}: {type(exc).__name__}: {exc}")
+        empty = np.empty((0, len(CALIBRATION_TARGETS)))
+        return empty, empty
 
 
+def score_arrays(sim, obs):
+    """
+    {stat: array} for CALIBRATION_STATS over axis -2 (periods) of two matching
+    (... x periods x targets) arrays. Periods missing on either side are
+    skipped; MAPE also skips zero observations.
+    """
+    err = sim - obs
+    valid = ~np.isnan(err)
+    err = np.where(valid, err, 0.0)
+    n = valid.sum(axis=-2)
+    nonzero = valid & (obs != 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ape = np.where(nonzero, np.abs(err / obs), 0.0)
+        return {
+            "rmse": np.sqrt((err ** 2).sum(axis=-2) / n),
+            "mape": 100 * ape.sum(axis=-2) / nonzero.sum(axis=-2),
+            "bias": err.sum(axis=-2) / n,
+            "n": n,
+        }
+
+
+def score_runs(names):
+    """Scores as a long frame, one row per (Run, Target); the runs are read in parallel."""
+    names = list(names)
+    with ThreadPoolExecutor(max_workers=max(1, min(SCORE_WORKERS, len(names)))) as pool:
+        pairs = list(pool.map(run_calibration_arrays, names))
+
+    # Runs of different lengths are padded with NaN, which score_arrays skips
+    targets = list(CALIBRATION_TARGETS.values())
+    sim = np.full((len(names), max((len(s) for s, _ in pairs), default=0), len(targets)), np.nan)
+    obs = sim.copy()
+    for i, (s, o) in enumerate(pairs):
+        sim[i, :len(s)] = s
+        obs[i, :len(o)] = o
+    stats = score_arrays(sim, obs)
+    return pd.DataFrame({
+        "Run": np.repeat(np.array(names, dtype=object), len(targets)),
+        "Target": np.tile(np.array(targets, dtype=object), len(names)),
+        **{stat: values.ravel() for stat, values in stats.items()},
+    })
+
+
+@lru_cache(maxsize=16)
+def calibration_leaderboard(names, keys):
+    """
+    (rows, columns) for the leaderboard table: one row per run, best mean MAPE
+    first. Cached on the runs' data_key()s (`keys`), so revisiting the page
+    does not score the sweep again until a run's files change.
+    """
+    scores = score_runs(names)
+    board = pd.DataFrame({"Run": list(names)})
+    columns = [{"name": ["", "Run"], "id": "Run"}]
+    for target in CALIBRATION_TARGETS.values():
+        part = scores[scores["Target"] == target]
+        label = next((k for k, v in MACRO_METRICS.items() if v == target), target)
+        for stat, stat_label in CALIBRATION_STATS.items():
+            scale = display_scale(target) if stat in ("rmse", "bias") else 1
+            board[f"{stat}|{target}"] = part[stat].to_numpy() * scale
+            columns.append({"name": [label, stat_label], "id": f"{stat}|{target}", "type": "numeric"})
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # runs without observations
+        board["mean_mape"] = board[[f"mape|{t}" for t in CALIBRATION_TARGETS.values()]].mean(axis=1)
+    columns.append({"name": ["", "Mean MAPE (%)"], "id": "mean_mape", "type": "numeric"})
+    board = board.sort_values("mean_mape", kind="stable", na_position="last").round(3)
+    return board.astype(object).where(board.notna(), None).to_dict("records"), columns
 
-@app.callback(Output("page-content", "children"), Input("url", "pathname"))
-def router(path):
-    if path and path.rstrip("/").endswith("/indust"):
-        return indust_body
-    if path and path.rstrip("/").endswith("/compare"):
-        return compare_body
-    return macro_body
 
-# Highlight active nav item
 @app.callback(
-    Output("nav-macro", "className"),
-    Output("nav-indust", "className"),
-    Output("nav-compare", "className"),
-    Input("url", "pathname"),
+    Output("calibration-table", "data"),
+    Output("calibration-table", "columns"),
+    Input("calibration-table", "id"),
+    background=True,  # reads every run of a sweep
 )
-def highlight_nav(pathname):
-    path = (pathname or "").rstrip("/")
-    def cls(active):
-        return "nav-item active" if active else "nav-item"
-    return (
-        cls(path.endswith("/macro") or path in ["", "/"]),
-        cls(path.endswith("/indust")),
-        cls(path.endswith("/compare")),
-    )
+def fill_calibration_table(_):
+    with phase("data"):
+        names = tuple(run_catalog.names())
+        return calibration_leaderboard(names, tuple(map(run_catalog.key, names)))
 
 # =========================================================
-# 8. THEME TOGGLE
+# 14. DOWNLOADS (STREAMING EXPORT ROUTE)
 # =========================================================
 
+# Exports are streamed by a plain Flask route in chunks of at most
+# EXPORT_CHUNK_ROWS rows, so memory stays flat whatever the selection size.
+# The page's Download link only carries the selection in its query string:
+#   /export?scope=macro|indust|compare&metrics=a|b|all&industries=1,2|all&runs=x|y&format=csv
+
+def rebatch(chunks, rows):
+    """Regroups a stream of small frames into frames of about `rows` rows."""
+    pending, size = [], 0
+    for chunk in chunks:
+        pending.append(chunk)
+        size += len(chunk)
+        if size >= rows:
+            yield pd.concat(pending, ignore_index=True)
+            pending, size = [], 0
+    if pending:
+        yield pd.concat(pending, ignore_index=True)
+
+
+def export_chunks(scope, metrics, industries, runs):
+    """
+    Frames with a fixed column set, per run: the macro frame, chunks of the
+    selected industries' rows (compare) or one industry slice at a time.
+    """
+    for run_name in runs:
+        run = run_catalog.get(run_name)
+        if scope == "macro":
+            frames = [run.macro_df.reindex(columns=["Period", *metrics])]
+        elif scope == "compare":
+            columns = ["Period", "Industry ID", *metrics]
+            if isinstance(run.df, IndustryStore):
+                chunks = run.df.batches(industries, metrics, EXPORT_CHUNK_ROWS)
+            else:
+                # The selected industries' contiguous row ranges, taken in chunks by position
+                ranges = [run.industry_slices.get(int(ind)) for ind in industries]
+                rows = np.concatenate([np.arange(sl.start, sl.stop) for sl in ranges if sl is not None] or [np.empty(0, int)])
+                chunks = (run.df.iloc[rows[i:i + EXPORT_CHUNK_ROWS]] for i in range(0, max(len(rows), 1), EXPORT_CHUNK_ROWS))
+            frames = (chunk.reindex(columns=columns).astype({"Industry ID": "int64"}) for chunk in chunks)
+        else:
+            frames = [industry_frame(ind, run, metrics).reindex(columns=["Period", *metrics]) for ind in industries]
+        for tmp in frames:
+            if len(runs) > 1:
+                tmp.insert(0, "Run", run_name)
+            yield tmp
+
+
+class _ChunkSink:
+    """Write-only file object for pyarrow writers; drain() hands on what was written so far."""
+
+    def __init__(self):
+        self.parts, self.pos, self.closed = [], 0, False
+
+    def write(self, data):
+        data = bytes(data)
+        self.parts.append(data)
+        self.pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.pos
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        out, self.parts = b"".join(self.parts), []
+        return out
+
+
+def stream_export(chunks, fmt):
+    """Yields the encoded file chunk by chunk (CSV, gzip CSV, Parquet row groups, Arrow IPC batches)."""
+    if fmt in ("csv", "csv.gz"):
+        gz = zlib.compressobj(6, zlib.DEFLATED, 31) if fmt == "csv.gz" else None
+        header = True
+        for chunk in chunks:
+            text = chunk.to_csv(index=False, header=header).encode()
+            header = False
+            yield gz.compress(text) if gz else text
+        if gz:
+            yield gz.flush()
+        return
+
+    import pyarrow.parquet as pq  # only reached when HAVE_ARROW (checked by the route)
+
+    sink, writer, schema = _ChunkSink(), None, None
+    for chunk in chunks:
+        table = pyarrow.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            schema = table.schema
+            writer = pq.ParquetWriter(sink, schema) if fmt == "parquet" else pyarrow.ipc.new_file(sink, schema)
+        else:
+            table = table.cast(schema)
+        writer.write_table(table)
+        yield sink.drain()
+    if writer is not None:
+        writer.close()
+        yield sink.drain()
+
+
+def _split(arg, sep):
+    return [v for v in (arg or "").split(sep) if v != ""]
+
+
+def parse_export(args):
+    """(scope, format, metrics, industries, runs, file name) of an /export query; aborts on bad input."""
+    scope = args.get("scope", "macro")
+    fmt = args.get("format", "csv")
+    if scope not in ("macro", "indust", "compare") or fmt not in EXPORT_FORMATS:
+        abort(400)
+    if fmt in ("parquet", "feather") and not HAVE_ARROW:
+        abort(501, "Parquet/Feather export needs pyarrow")
+
+    known = list(dict.fromkeys((MACRO_METRICS if scope == "macro" else INDUST_METRICS).values()))
+    metrics = known if args.get("metrics") == "all" else [m for m in _split(args.get("metrics"), "|") if m in known]
+    if args.get("industries") == "all":
+        industries = sorted(dataset().run.industry_slices)
+    else:
+        try:
+            industries = [int(float(i)) for i in _split(args.get("industries"), ",")]
+        except (ValueError, OverflowError):
+            abort(400)
+    if scope == "indust":
+        industries = industries[:1] or [dataset().default_industry]
+    runs = selected_runs([_split(args.get("runs"), "|")]) if scope != "indust" else (DEFAULT_RUN,)
+
+    if scope == "indust":
+        name = f"indust_{industries[0]}"
+    else:
+        name = {"macro": "macro", "compare": "comparison"}[scope]
+    return scope, fmt, metrics, industries, runs, name + EXPORT_FORMATS[fmt][2]
+
+
+# Streamed downloads hold a server thread until they finish, so only
+# JOB_WORKERS run at once; the rest get 503 and interactive requests keep theirs.
+_export_slots = threading.BoundedSemaphore(JOB_WORKERS)
+
+
+@server.route("/export")
+def export():
+    scope, fmt, metrics, industries, runs, filename = parse_export(request.args)
+    if not _export_slots.acquire(blocking=False):
+        return Response("Too many downloads in progress; try again shortly.", status=503, headers={"Retry-After": "5"})
+    chunks = rebatch(export_chunks(scope, metrics, industries, runs), EXPORT_CHUNK_ROWS)
+    resp = Response(
+        stream_with_context(stream_export(chunks, fmt)),
+        mimetype=EXPORT_FORMATS[fmt][1],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+    resp.call_on_close(_export_slots.release)
+    return resp
+
+
+def export_rows(scope, industries, runs):
+    """Row count of an export, for its progress bar."""
+    total = 0
+    for run_name in runs:
+        run = run_catalog.get(run_name)
+        if scope == "macro":
+            total += len(run.macro_df)
+        else:
+            total += sum(sl.stop - sl.start for sl in map(run.industry_slices.get, industries) if sl is not None)
+    return total
+
+
+def prune_exports():
+    """Removes prepared files (and leftovers of cancelled jobs) older than EXPORT_KEEP_S."""
+    cutoff = time.time() - EXPORT_KEEP_S
+    for fp in glob.glob(os.path.join(EXPORT_DIR, "*.*")):
+        try:
+            if os.path.getmtime(fp) < cutoff:
+                os.remove(fp)
+        except OSError:
+            pass
+
+
+def write_export(query, set_progress):
+    """Writes the export an /export query string describes into EXPORT_DIR; returns (file name, rows, bytes)."""
+    scope, fmt, metrics, industries, runs, filename = parse_export(dict(parse_qsl(query)))
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    prune_exports()
+    name = f"{secrets.token_hex(8)}-{filename}"
+    part = os.path.join(EXPORT_DIR, name + ".part")
+    total, done = max(export_rows(scope, industries, runs), 1), 0
+
+    def counted(chunks):
+        nonlocal done
+        for chunk in chunks:
+            done += len(chunk)
+            yield chunk
+
+    try:
+        with open(part, "wb") as fh:
+            for piece in stream_export(counted(rebatch(export_chunks(scope, metrics, industries, runs), EXPORT_CHUNK_ROWS)), fmt):
+                fh.write(piece)
+                set_progress((round(100 * done / total), f"{done:,} / {total:,} rows"))
+        os.replace(part, os.path.join(EXPORT_DIR, name))
+    finally:
+        if os.path.exists(part):
+            os.remove(part)
+    return name, done, os.path.getsize(os.path.join(EXPORT_DIR, name))
+
+
 @app.callback(
-    [Output("theme-link", "href"), Output("theme-store", "data")],
-    Input("theme-switch", "value")
+    Output("export-file", "href"),
+    Output("export-file", "children"),
+    Output("export-file", "style"),
+    Input("export-start", "n_clicks"),
+    State({"type": "download-btn", "page": "compare"}, "href"),
+    background=True,
+    running=[
+        (Output("export-start", "disabled"), True, False),
+        (Output("export-cancel", "disabled"), False, True),
+        (Output("export-progress", "style"), {"width": "160px"}, {"width": "160px", "display": "none"}),
+    ],
+    cancel=[Input("export-cancel", "n_clicks")],
+    progress=[Output("export-progress", "value"), Output("export-progress", "label")],
+    progress_default=[0, ""],
+    interval=500,
+    prevent_initial_call=True,
 )
-def toggle_theme(is_dark):
-    return (dbc.themes.MINTY, "dark") if is_dark else (dbc.themes.MINTY, "light")
+def prepare_export(set_progress, _, href):
+    name, rows, size = write_export(href.split("?", 1)[1] if "?" in href else "", set_progress)
+    label = f"Save {name.split('-', 1)[1]} ({rows:,} rows, {size / 1e6:,.1f} MB)"
+    return f"/export/file/{name}", label, {"display": "inline"}
 
-# =========================================================
-# 9. UNIFIED FIGURE CALLBACK
-# =========================================================
 
-@app.callback(
-    Output({"type": "ts-graph", "page": MATCH}, "figure"),
+@server.route("/export/file/<name>")
+def export_file(name):
+    if not (len(name) > 17 and name[16] == "-" and all(c in "0123456789abcdef" for c in name[:16])):
+        abort(404)
+    return send_from_directory(EXPORT_DIR, name, as_attachment=True, download_name=name[17:])
+
+
+# The Download link is rebuilt in the browser whenever the selection changes
+app.clientside_callback(
+    r"""
+    function(metrics, fmt, industInd, compareInd, runSel, exportAll, pathname) {
+        var path = (pathname || "").replace(/\/+$/, "");
+        var page = path.endsWith("/indust") ? "indust" : (path.endsWith("/compare") ? "compare" : "macro");
+        var all = !!(exportAll && exportAll[0]);
+        if (!Array.isArray(metrics)) { metrics = metrics ? [metrics] : []; }
+        var params = new URLSearchParams({scope: page, format: fmt || "csv"});
+        params.set("metrics", all ? "all" : metrics.join("|"));
+        if (page === "indust" && industInd && industInd[0] != null) {
+            params.set("industries", industInd[0]);
+        }
+        if (page === "compare") {
+            params.set("industries", all ? "all" : [].concat(compareInd[0] || []).join(","));
+        }
+        if (runSel && runSel[0]) {
+            params.set("runs", [].concat(runSel[0]).join("|"));
+        }
+        return "/export?" + params.toString();
+    }
+    """,
+    Output({"type": "download-btn", "page": MATCH}, "href"),
     [
         Input({"type": "metrics-dropdown", "page": MATCH}, "value"),
+        Input({"type": "export-format", "page": MATCH}, "value"),
         Input({"type": "industry-dropdown", "page": ALL}, "value"),
         Input({"type": "industry-multi", "page": ALL}, "value"),
+        Input({"type": "run-multi", "page": ALL}, "value"),
+        Input({"type": "export-all", "page": ALL}, "value"),
         Input("url", "pathname"),
-        Input("theme-store", "data"),
-    ]
+    ],
 )
-def draw_timeseries(metrics_selected, indust_ind, compare_ind, pathname, theme):
 
-    template = "plotly_dark" if theme == "dark" else "plotly_white"
-    template = "minty_dark" if theme == "dark" else "minty"
-    path = (pathname or "").rstrip("/")
+# =========================================================
+# 15. QUERY API
+# =========================================================
+# Read-only endpoints for scripts, served from the same indexes as the pages:
+#   /api/meta
+#   /api/series?industry=3|1,2|all&metric=Total Sales|all&periods=10-20&run=...&format=json|arrow
+#   /api/macro?metric=...&periods=...&run=...&format=json|arrow
+#   /api/calibration?run=a|b|all&target=...&sort=rmse|mape|bias&format=json|arrow
+# Responses carry an ETag derived from the data_key() of the runs read and the
+# query, so a repeated query with If-None-Match is answered 304 without touching
+# the data, by any worker and across restarts, until the run's files change.
 
-    # ----- Macro -----
-    if path.endswith("/macro") or path in ["", "/"]:
-        metrics = metrics_selected or []
-        if isinstance(metrics, str):
-            metrics = [metrics]
-
-        fig = go.Figure()
-        for col in metrics:
-            if col in macro_df.columns:
-                fig.add_trace(go.Scatter(
-                    x=macro_df["Period"], y=macro_df[col],
-                    mode="lines+markers", name=f"{col} (£bn)"
-                ))
-        fig.update_layout(title="Macroeconomic Indicators Over Time", xaxis_title="Period")
-        return format_currency_axis(fig, template, theme)
+ARROW_STREAM_MIMETYPE = "application/vnd.apache.arrow.stream"
 
-    # ----- Micro -----
-    if path.endswith("/indust"):
-        metrics = metrics_selected or []
-        if isinstance(metrics, str):
-            metrics = [metrics]
-        industry = indust_ind[0] if (indust_ind and indust_ind[0]) else default_industry
-
-        dff = df[df["Industry ID"] == industry].sort_values("Period")
-        fig = go.Figure()
-        for col in metrics:
-            if col in dff.columns:
-                fig.add_trace(go.Scatter(
-                    x=dff["Period"], y=dff[col],
-                    mode="lines+markers", name=f"{col} (£bn)"
-                ))
-        fig.update_layout(title=f"Industry-{industry} Indicators Over Time", xaxis_title="Period")
-        return format_currency_axis(fig, template, theme)
 
-    # ----- Comparison -----
-    if path.endswith("/compare"):
-        metric = metrics_selected
-        if isinstance(metric, list):
-            metric = metric[0] if metric else "Total domestic production"
+def api_metrics(arg_values, metrics):
+    known = list(dict.fromkeys(metrics.values()))
+    wanted = [m for v in arg_values for m in v.split("|") if m]
+    if not wanted or "all" in wanted:
+        return known
+    unknown = [m for m in wanted if m not in known]
+    if unknown:
+        abort(400, f"unknown metric(s): {', '.join(unknown)}")
+    return wanted
 
-        inds = compare_ind[0] if (compare_ind and compare_ind[0]) else []
-        if isinstance(inds, int):
-            inds = [inds]
 
-        fig = go.Figure()
-        
-        for ind in inds:
-            dff = df[df["Industry ID"] == ind].sort_values("Period")
-            if metric in dff.columns:
-                fig.add_trace(go.Bar(
-                    x=dff["Period"],
-                    y=dff[metric],
-                    name=f"Industry {ind}"
-                ))
+def api_periods(frame, arg):
+    """Filters frame by periods given as 'a-b', 'a,b,c' or a single period."""
+    if not arg:
+        return frame
+    try:
+        if "-" in arg.strip("-"):
+            lo, hi = (float(v) for v in arg.split("-", 1))
+            return frame[frame["Period"].between(lo, hi)]
+        return frame[frame["Period"].isin([float(v) for v in arg.split(",") if v])]
+    except ValueError:
+        abort(400, f"bad periods: {arg}")
 
-        fig.update_layout(
-            barmode="group",
-            title=f"Comparison — {metric} across Industries",
-            xaxis_title="Period"
-        )
 
-        return format_currency_axis(fig, template, theme)
+def api_run(arg):
+    name = arg or DEFAULT_RUN
+    if name not in run_catalog.names():
+        abort(404, f"unknown run: {name}")
+    return name
 
-# =========================================================
-# 10. DOWNLOAD CALLBACKS
-# =========================================================
 
-@app.callback(
-    Output({"type": "download", "page": "macro"}, "data"),
-    Input({"type": "download-btn", "page": "macro"}, "n_clicks"),
-    State({"type": "metrics-dropdown", "page": "macro"}, "value"),
-    prevent_initial_call=True
-)
-def download_macro(n, metrics):
-    if isinstance(metrics, str):
-        metrics = [metrics]
-    cols = ["Period"] + metrics
-    return dcc.send_data_frame(macro_df[cols].to_csv, "macro.csv", index=False)
+def api_response(frame_fn, runs, etag_extra=""):
+    """JSON (pandas 'split' layout) or Arrow IPC stream, with an ETag on the data of `runs`."""
+    fmt = request.args.get("format")
+    if fmt is None:
+        fmt = "arrow" if ARROW_STREAM_MIMETYPE in request.headers.get("Accept", "") else "json"
+    if fmt not in ("json", "arrow"):
+        abort(400, f"bad format: {fmt}")
+    if fmt == "arrow" and not HAVE_ARROW:
+        abort(501, "Arrow responses need pyarrow")
 
-@app.callback(
-    Output({"type": "download", "page": "indust"}, "data"),
-    Input({"type": "download-btn", "page": "indust"}, "n_clicks"),
-    [
-        State({"type": "industry-dropdown", "page": "indust"}, "value"),
-        State({"type": "metrics-dropdown", "page": "indust"}, "value"),
-    ],
-    prevent_initial_call=True
-)
-def download_indust(n, ind, metrics):
-    if isinstance(metrics, str):
-        metrics = [metrics]
-    dff = df[df["Industry ID"] == ind].sort_values("Period")
-    cols = ["Period"] + metrics
-    return dcc.send_data_frame(dff[cols].to_csv, f"indust_{ind}.csv", index=False)
+    version = dataset().version
+    data_keys = ",".join(run_catalog.key(name) for name in runs)
+    key = f"{data_keys}|{request.path}|{sorted(request.args.items(multi=True))}|{fmt}|{etag_extra}"
+    etag = hashlib.sha1(key.encode()).hexdigest()
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+        resp.set_etag(etag)
+        return resp
 
-@app.callback(
-    Output({"type": "download", "page": "compare"}, "data"),
-    Input({"type": "download-btn", "page": "compare"}, "n_clicks"),
-    [
-        State({"type": "metrics-dropdown", "page": "compare"}, "value"),
-        State({"type": "industry-multi", "page": "compare"}, "value"),
-    ],
-    prevent_initial_call=True
-)
-def download_compare(n, metric, inds):
-    if isinstance(inds, int):
-        inds = [inds]
-    rows = []
-    for ind in inds:
-        dff = df[df["Industry ID"] == ind].sort_values("Period")
-        if metric in dff.columns:
-            tmp = dff[["Period", metric]].copy()
-            tmp.insert(1, "Industry ID", ind)
-            rows.append(tmp)
-    out = pd.concat(rows)
-    return dcc.send_data_frame(out.to_csv, "comparison.csv", index=False)
+    frame = frame_fn()
+    if fmt == "arrow":
+        table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+        sink = pyarrow.BufferOutputStream()
+        with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        resp = Response(sink.getvalue().to_pybytes(), mimetype=ARROW_STREAM_MIMETYPE)
+    else:
+        resp = Response(frame.to_json(orient="split", index=False), mimetype="application/json")
+    resp.set_etag(etag)
+    resp.headers["X-ABEM-Data-Version"] = str(version)
+    return resp
+
+
+@server.route("/api/meta")
+def api_meta():
+    return jsonify({
+        "version": dataset().version,
+        "default_run": DEFAULT_RUN,
+        "runs": run_catalog.names(),
+        "industries": sorted(dataset().run.industry_slices),
+        "macro_metrics": MACRO_METRICS,
+        "industry_metrics": INDUST_METRICS,
+        "calibration_targets": CALIBRATION_TARGETS,
+    })
+
+
+@server.route("/api/series")
+def api_series():
+    args = request.args
+    metrics = api_metrics(args.getlist("metric"), INDUST_METRICS)
+    run_name = api_run(args.get("run"))
+    industry_arg = args.get("industry", "")
+    if industry_arg == "all":
+        industries = None
+    else:
+        try:
+            industries = [int(float(i)) for i in industry_arg.split(",") if i]
+        except (ValueError, OverflowError):
+            abort(400, f"bad industry: {industry_arg}")
+        if not industries:
+            abort(400, "industry is required")
+
+    def frame():
+        run = run_catalog.get(run_name)
+        inds = sorted(run.industry_slices) if industries is None else industries
+        parts = [api_periods(f, args.get("periods")) for f in export_chunks("compare", metrics, inds, (run_name,))]
+        return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=["Period", "Industry ID", *metrics])
+
+    return api_response(frame, [run_name])
+
+
+@server.route("/api/calibration")
+def api_calibration():
+    """Scores per run and target; ?run=a|b|all&target=...&sort=rmse|mape|bias (best first)."""
+    args = request.args
+    names = [n for v in args.getlist("run") for n in v.split("|") if n]
+    if not names or "all" in names:
+        names = run_catalog.names()
+    unknown = [n for n in names if n not in run_catalog.names()]
+    if unknown:
+        abort(404, f"unknown run(s): {', '.join(unknown)}")
+    targets = api_metrics(args.getlist("target"), {t: t for t in CALIBRATION_TARGETS.values()})
+    sort = args.get("sort")
+    if sort not in (None, "rmse", "mape", "bias"):
+        abort(400, f"bad sort: {sort}")
+
+    def frame():
+        scores = score_runs(names)
+        scores = scores[scores["Target"].isin(targets)]
+        if sort:
+            scores = scores.sort_values(sort, key=abs, kind="stable", na_position="last")
+        return scores.reset_index(drop=True)
+
+    return api_response(frame, names)
+
+
+@server.route("/api/macro")
+def api_macro():
+    args = request.args
+    metrics = api_metrics(args.getlist("metric"), MACRO_METRICS)
+    run_name = api_run(args.get("run"))
+
+    def frame():
+        macro = run_catalog.get(run_name).macro_df
+        return api_periods(macro.reindex(columns=["Period", *metrics]), args.get("periods")).reset_index(drop=True)
+
+    return api_response(frame, [run_name])
 
 # =========================================================
-# 11. CUSTOM HTML, CSS & JS (COLLAPSIBLE SIDEBAR + TOOLTIP)
+# 16. CUSTOM HTML, CSS & JS (COLLAPSIBLE SIDEBAR + TOOLTIP)
 # =========================================================
 
 app.index_string = """
@@ -980,8 +4038,209 @@ app.index_string = """
 """
 
 # =========================================================
-# 12. RUN APP
+# 17. APP FACTORY + READINESS
+# =========================================================
+# create_app() returns the app straight away; the data loads on a thread.
+#   /healthz  -> 200 as soon as the server is up
+#   /readyz   -> 200 once the data is loaded (and warmed up), 503 before or on error
+#   /reload   -> POST rebuilds the data in the background and swaps it in; GET reports on it
+# Under gunicorn:  gunicorn -w 4 "Dashboard_for_ABEM:create_app().server"
+
+# Settings create_app(config) may override; layout-shaping ones (ABEM_CLIENTSIDE,
+# ABEM_LIVE_TAIL) register callbacks at import and are environment-only.
+APP_SETTINGS = (
+    "BASE_DIR", "RUNS_ROOT", "USE_CACHE", "INGEST_WORKERS", "COMPACT", "SHARED", "RUN_MEMORY_BUDGET_MB",
+    "MAX_POINTS", "EXPORT_CHUNK_ROWS", "SLOW_MS", "SLOW_LOG", "WARMUP", "BACKGROUND_LOAD",
+    "RELOAD_TOKEN", "WATCH", "WATCH_INTERVAL_S",
+)
+_loader = None
+_watcher = None
+_reload_lock = threading.Lock()
+reload_state = {"status": "idle", "error": None, "seconds": None, "reloads": 0}
+
+
+def warm_up():
+    """Pre-renders each page's default view so the first visitors hit the figure cache."""
+    pin_dataset()  # one snapshot throughout, should a reload land meanwhile
+    try:
+        data = dataset()
+        views = [
+            normalize_view(["Observed domestic production CVM", "Total domestic production CVM"], [], [], "/macro"),
+            normalize_view(default_indust_metrics, [data.default_industry], [], "/indust"),
+            normalize_view("Total domestic production CVM", [], [[o["value"] for o in data.industry_options[:5]]], "/compare"),
+        ]
+        for view in views:
+            if view[0] in CLIENTSIDE_PAGES:
+                continue
+            build_figure(*view, "light", data.version)
+        build_heatmap("Total domestic production CVM", "id", "value", normalize_resolution(), "light", data.version)
+        # The period pyramids of the default run, so changing resolution is served from memory
+        # (an out-of-core store builds industry levels per chart, for the industries shown)
+        for col in dict.fromkeys(MACRO_METRICS.values()):
+            macro_pyramid(DEFAULT_RUN, col, data.version)
+        if isinstance(data.run.df, pd.DataFrame):
+            for col in dict.fromkeys(INDUST_METRICS.values()):
+                industry_pyramid(DEFAULT_RUN, col, data.version)
+        if CLIENTSIDE:
+            build_client_bundle(data.key)
+    finally:
+        _pinned.dataset = None
+
+
+def load_in_background(warmup):
+    t0 = time.perf_counter()
+    load_state["status"] = "loading"
+    try:
+        load_data()
+        if warmup:
+            load_state["status"] = "warming"
+            warm_up()
+    except Exception as exc:
+        load_state.update(status="error", error=f"{type(exc).__name__}: {exc}")
+        print(f"[startup] loading failed: {load_state['error']}")
+        return
+    load_state.update(status="ready", seconds=round(time.perf_counter() - t0, 3))
+    data_ready.set()
+    print(f"[startup] data ready in {load_state['seconds']}s")
+
+
+def reload_data():
+    """
+    Rebuilds the data from BASE_DIR and swaps it in (see load_data). Only one
+    reload runs at a time; returns False if one was already running.
+    """
+    if not _reload_lock.acquire(blocking=False):
+        return False
+    _reload_holding_lock()
+    return True
+
+
+def start_reload():
+    """reload_data() on a thread; False if a reload is already running."""
+    if not _reload_lock.acquire(blocking=False):
+        return False
+    threading.Thread(target=_reload_holding_lock, name="abem-reload", daemon=True).start()
+    return True
+
+
+def _reload_holding_lock():
+    t0 = time.perf_counter()
+    reload_state.update(status="reloading", error=None)
+    try:
+        load_data()
+        if WARMUP:
+            warm_up()
+    except Exception as exc:
+        reload_state.update(status="error", error=f"{type(exc).__name__}: {exc}")
+        print(f"[reload] failed, still serving version {_dataset.version}: {reload_state['error']}")
+    else:
+        reload_state.update(status="idle", seconds=round(time.perf_counter() - t0, 3), reloads=reload_state["reloads"] + 1)
+        print(f"[reload] version {_dataset.version} ready in {reload_state['seconds']}s")
+    finally:
+        _reload_lock.release()
+
+
+def watch_base_dir():
+    """
+    Reloads when BASE_DIR differs from what the current data was read from and
+    the difference holds for two scans (files still being written wait). With
+    the live tail on, new period files alone are left to it.
+    """
+    pending = None
+    while True:
+        time.sleep(WATCH_INTERVAL_S)
+        if not data_ready.is_set():
+            continue
+        known, seen = _dataset.files, dir_signature(BASE_DIR)
+        changed = {n for n in known.keys() | seen.keys() if known.get(n) != seen.get(n)}
+        if LIVE_TAIL:
+            changed = {n for n in changed if n in known or not n.startswith("Industrial_results_for_period_")}
+        if not changed or seen != pending:
+            pending = seen if changed else None
+            continue
+        pending = None
+        print(f"[watch] {len(changed)} changed files under {BASE_DIR}; reloading")
+        reload_data()
+
+
+def create_app(config=None):
+    """
+    Applies config ({setting: value}, see APP_SETTINGS) and starts loading the
+    data, on a background thread unless BACKGROUND_LOAD is False. The Dash app
+    is module-level, so repeated calls return it without reloading.
+    """
+    global _loader, _watcher, PATTERN, DEFAULT_RUN
+    for key, value in (config or {}).items():
+        if key not in APP_SETTINGS:
+            raise ValueError(f"unknown setting {key!r}; expected one of {', '.join(APP_SETTINGS)}")
+        globals()[key] = value
+    PATTERN = os.path.join(BASE_DIR, "Industrial_results_for_period_*.csv")
+    DEFAULT_RUN = os.path.basename(os.path.normpath(BASE_DIR))
+
+    if _loader is None:
+        if BACKGROUND_LOAD:
+            _loader = threading.Thread(target=load_in_background, args=(WARMUP,), name="abem-loader", daemon=True)
+            _loader.start()
+        else:
+            _loader = threading.current_thread()
+            load_in_background(WARMUP)
+    if WATCH and _watcher is None:
+        _watcher = threading.Thread(target=watch_base_dir, name="abem-watch", daemon=True)
+        _watcher.start()
+    return app
+
+
+@server.route("/healthz")
+def healthz():
+    return jsonify({"status": "ok"})
+
+
+@server.route("/readyz")
+def readyz():
+    data = dataset()
+    body = dict(load_state, version=data.version)
+    if data_ready.is_set():
+        body.update(periods=len(data.run.macro_df), industries=len(data.run.industry_slices))
+    return jsonify(body), (200 if data_ready.is_set() else 503)
+
+
+@server.route("/reload", methods=["GET", "POST"])
+def reload():
+    """POST starts a reload (202, 409 while one runs); GET reports on the last one."""
+    status = 200
+    if request.method == "POST":
+        if RELOAD_TOKEN and not secrets.compare_digest(request.headers.get("X-ABEM-Token", ""), RELOAD_TOKEN):
+            abort(403)
+        if not data_ready.is_set():
+            return jsonify(load_state), 503
+        status = 202 if start_reload() else 409
+    return jsonify(dict(reload_state, version=_dataset.version)), status
+
+
+@server.before_request
+def pin_request_dataset():
+    """Each request reads the data snapshot current when it started."""
+    pin_dataset()
+
+
+@server.teardown_request
+def unpin_request_dataset(_exc):
+    _pinned.dataset = None
+
+
+@server.before_request
+def require_data():
+    """Data routes answer 503 (with the loader status) until the data is loaded."""
+    if request.endpoint in ("export", "api_meta", *TIMED_ROUTES) and not data_ready.is_set():
+        return jsonify(load_state), 503
+
+# =========================================================
+# 18. RUN APP
 # =========================================================
 
 if __name__ == "__main__":
-    app.run(debug=True, port=8055)
\ No newline at end of file
+    # python Dashboard_for_ABEM.py --ingest-report  -> serial vs parallel ingest timings
+    if "--ingest-report" in sys.argv:
+        ingest_timing_report(sorted(glob.glob(PATTERN)))
+        sys.exit(0)
+    create_app().run(debug=True, port=8055)
\ No newline at end of file
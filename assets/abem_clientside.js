@@ -0,0 +1,120 @@
+// Client-side figure assembly for ABEM_CLIENTSIDE=1 (see build_client_bundle).
+// Mirrors build_figure + format_currency_axis + auto_place_legend in the
+// Python app, reading from the per-session "client-bundle" store.
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    abem: {
+        draw_timeseries: function (metricsSelected, industInd, compareInd, pathname, theme, bundle) {
+            if (!bundle) {
+                return window.dash_clientside.no_update;
+            }
+            var path = (pathname || "").replace(/\/+$/, "");
+            var isCompare = path.endsWith("/compare");
+            var traces = [];
+            var title;
+
+            function series(ind) {
+                return bundle.industries[String(ind)];
+            }
+
+            function addTrace(entry, col, name) {
+                if (!entry || !(col in entry)) {
+                    return;
+                }
+                var y = entry[col];
+                var pct = bundle.units[col] === "%";
+                var trace = {
+                    x: entry.x || bundle.periods,
+                    y: y,
+                    name: name,
+                    meta: bundle.units[col],
+                    hovertemplate: pct ? "%{x}<br>%{y:,.2f}%<extra></extra>"
+                                       : "%{x}<br>£%{y:,.2f} bn<extra></extra>"
+                };
+                if (isCompare) {
+                    trace.type = "bar";
+                } else {
+                    trace.type = "scatter";
+                    trace.mode = "lines+markers";
+                }
+                traces.push(trace);
+            }
+
+            if (isCompare) {
+                var metric = Array.isArray(metricsSelected) ? metricsSelected[0] : metricsSelected;
+                var inds = (compareInd && compareInd[0]) ? compareInd[0] : [];
+                if (!Array.isArray(inds)) {
+                    inds = [inds];
+                }
+                inds = Array.from(new Set(inds)).sort(function (a, b) { return a - b; });
+                inds.forEach(function (ind) {
+                    addTrace(series(ind), metric, "Industry " + ind);
+                });
+                title = "Comparison — " + metric + " across Industries";
+            } else {
+                var metrics = metricsSelected || [];
+                if (!Array.isArray(metrics)) {
+                    metrics = [metrics];
+                }
+                var industry = (industInd && industInd[0]) ? industInd[0] : bundle.default_industry;
+                // Same trace order as the server (ordered_metrics): as selected, without repeats
+                metrics.filter(function (col, i) {
+                    return col in bundle.metrics && metrics.indexOf(col) === i;
+                }).forEach(function (col) {
+                    addTrace(series(industry), col, col + " (" + bundle.units[col] + ")");
+                });
+                title = "Industry-" + industry + " Indicators Over Time";
+            }
+
+            var colors = bundle.legend[theme === "dark" ? "dark" : "light"];
+            var legend = {
+                bgcolor: colors[0], bordercolor: colors[1], borderwidth: 1,
+                font: {size: 12}, traceorder: "normal"
+            };
+            var margin = {l: 40, r: 40, t: 50, b: 50};
+            if (isCompare || traces.length > 3) {
+                Object.assign(legend, {orientation: "h", yanchor: "bottom", y: 1.02, xanchor: "right", x: 1.0});
+                margin.t = 70;
+            } else {
+                Object.assign(legend, {orientation: "v", x: 0.01, y: 0.99, xanchor: "left", yanchor: "top"});
+            }
+
+            // Integer periods: a tick per period on short runs, automatic ticks on long ones
+            var span = 0;
+            traces.forEach(function (t) {
+                var lo = Infinity, hi = -Infinity;
+                t.x.forEach(function (p) {
+                    lo = Math.min(lo, p);
+                    hi = Math.max(hi, p);
+                });
+                span = Math.max(span, hi - lo);
+            });
+            var xaxis = span <= bundle.dtick_max_periods ? {tickmode: "linear", dtick: 1} : {tickmode: "auto"};
+
+            var layout = {
+                template: bundle.templates[theme === "dark" ? "dark" : "light"],
+                title: {text: title, x: 0.5},
+                height: 350,
+                autosize: false,
+                margin: margin,
+                uirevision: "static",
+                legend: legend,
+                showlegend: false,
+                xaxis: Object.assign(xaxis, {tickformat: ".0f", title: {text: "Period"}}),
+                yaxis: {title: {text: "£ billion"}, tickprefix: "£", tickformat: ","}
+            };
+            // Percentages: their own axis, or a second one on the right next to money traces
+            var pctTraces = traces.filter(function (t) { return t.meta === "%"; });
+            if (traces.length && pctTraces.length === traces.length) {
+                layout.yaxis = {title: {text: "%"}, ticksuffix: "%", tickformat: ","};
+            } else if (pctTraces.length) {
+                layout.yaxis2 = {title: {text: "%"}, ticksuffix: "%", overlaying: "y", side: "right", showgrid: false};
+                pctTraces.forEach(function (t) { t.yaxis = "y2"; });
+            }
+            if (isCompare) {
+                layout.barmode = "group";
+            }
+            return {data: traces, layout: layout};
+        }
+    }
+});
@@ -0,0 +1,269 @@
+import os
+import sys
+import gzip
+import json
+import time
+import shutil
+import base64
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+
+# =========================================================
+# DASHBOARD BENCHMARKS
+# =========================================================
+# Times the dashboard's stages on synthetic output and saves the results as
+# JSON, so runs from different commits can be compared:
+#   python benchmark_dashboard.py --industries 200 --periods 400 --out bench.json
+#   python benchmark_dashboard.py --industries 200 --periods 400 --compare bench.json
+# An existing run directory can be timed instead with --data DIR.
+
+SLOWER_RATIO = 1.2  # --compare flags stages whose median grew by more than this
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the ABEM dashboard.")
+    parser.add_argument("--data", help="run directory to time (default: generate synthetic output)")
+    parser.add_argument("--industries", type=int, default=100)
+    parser.add_argument("--periods", type=int, default=200)
+    parser.add_argument("--extra-columns", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--storage", choices=["memory", "arrow"], default="memory", help="ABEM_STORAGE backend to time")
+    parser.add_argument("--out", help="write results to this JSON file")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    return parser.parse_args()
+
+
+def prepare_data(args):
+    """Run directory to benchmark; synthetic output is generated once per scale and reused."""
+    if args.data:
+        return args.data
+    from generate_abem_output import generate
+
+    scale = f"{args.industries}x{args.periods}x{args.extra_columns}_s{args.seed}"
+    out_dir = os.path.join(tempfile.gettempdir(), f"abem_bench_{scale}")
+    if not os.path.exists(os.path.join(out_dir, "Economy-wide_periodic_results.csv")):
+        print(f"[bench] generating {scale} in {out_dir}")
+        generate(out_dir, args.industries, args.periods, args.extra_columns, args.seed)
+    return out_dir
+
+
+def timed(fn, repeat, setup=None):
+    """Runs fn `repeat` times (setup() untimed before each) and returns timing stats in seconds."""
+    times = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        t0 = time.perf_counter()
+        fn(arg) if setup else fn()
+        times.append(time.perf_counter() - t0)
+    return {"runs": repeat, "min_s": min(times), "median_s": statistics.median(times), "mean_s": statistics.fmean(times)}
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def plain_json_arrays(obj):
+    """Figure dict with Plotly typed arrays ({"dtype", "bdata"}) turned back into JSON lists of float64."""
+    import numpy as np
+
+    if isinstance(obj, dict):
+        if "bdata" in obj and "dtype" in obj:
+            values = np.frombuffer(base64.b64decode(obj["bdata"]), dtype=obj["dtype"]).astype("float64")
+            shape = [int(n) for n in str(obj.get("shape", len(values))).split(",")]
+            return values.reshape(shape).tolist()
+        return {k: plain_json_arrays(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [plain_json_arrays(v) for v in obj]
+    return obj
+
+
+def payload_sizes(d):
+    """{figure: {encoding: bytes}} of each page's figure: plain JSON lists, typed arrays as sent, and compressed."""
+    from plotly.io.json import to_json_plotly
+
+    views = {f"figure.{page}": (lambda b=b: d.build_figure(*d.normalize_view(*b), "light", d.DATA_VERSION))
+             for page, b in page_branches(d).items()}
+    views["heatmap"] = lambda: d.build_heatmap("Total Sales", "id", "value", d.normalize_resolution(), "light", d.DATA_VERSION)
+    sizes = {}
+    for name, build in views.items():
+        fig = build()
+        sent = to_json_plotly(fig).encode()
+        sizes[name] = {
+            "json_lists": len(to_json_plotly(plain_json_arrays(fig)).encode()),
+            "typed_arrays": len(sent),
+            "gzip": len(gzip.compress(sent, d.COMPRESS_LEVEL)),
+        }
+        if d.HAVE_BROTLI:
+            sizes[name]["brotli"] = len(d.brotli.compress(sent, quality=d.COMPRESS_LEVEL))
+        print(f"[bench] payload {name:<24} " + "  ".join(f"{k} {v / 1e3:,.1f} kB" for k, v in sizes[name].items()))
+    return sizes
+
+
+def page_branches(d):
+    """draw_timeseries inputs (metrics, industry, industries, path) of each page's benchmarked view."""
+    industries = sorted(d.industry_slices)
+    return {
+        "macro": (list(d.MACRO_METRICS.values())[:3], [], [], "/macro"),
+        "indust": (d.default_indust_metrics, [industries[0]], [], "/indust"),
+        "compare": ("Total Sales", [], [industries[:10]], "/compare"),
+    }
+
+
+def run_benchmarks(d, repeat):
+    """{stage: stats} for ingestion, aggregation, the figure callback, the period pyramid, the axis formatter and the downloads."""
+    import plotly.graph_objects as go
+
+    results = {}
+
+    def record(stage, stats):
+        results[stage] = stats
+        print(f"[bench] {stage:<32} median {stats['median_s'] * 1000:10.2f} ms   min {stats['min_s'] * 1000:10.2f} ms")
+
+    # ----- Ingestion -----
+    if d.STORAGE == "arrow":
+        scratch = tempfile.mkdtemp(prefix="abem_bench_store_")
+        builds = iter(range(repeat))
+        fresh_dir = lambda: os.path.join(scratch, str(next(builds)))
+        record("ingest.store", timed(lambda path: d.build_store(d.BASE_DIR, d.file_paths, path), repeat, setup=fresh_dir))
+        shutil.rmtree(scratch)
+        record("ingest.store.open", timed(lambda: d.load_run(d.BASE_DIR, d.file_paths), repeat))
+    else:
+        use_cache = d.USE_CACHE
+        d.USE_CACHE = False
+        record("ingest.csv", timed(lambda: d.load_industrial_results(d.file_paths, d.BASE_DIR), repeat))
+        d.USE_CACHE = use_cache
+        if use_cache:
+            d.load_industrial_results(d.file_paths, d.BASE_DIR)  # make sure the cache is current
+            record("ingest.cache", timed(lambda: d.load_industrial_results(d.file_paths, d.BASE_DIR), repeat))
+        record("macro_df.aggregate", timed(lambda: d.build_macro_df(d.df, d.economy_wide_df), repeat))
+
+    # ----- draw_timeseries, one branch per page -----
+    industries = sorted(d.industry_slices)
+    branches = page_branches(d)
+    for page, (metrics, indust_ind, compare_ind, path) in branches.items():
+        draw = lambda _=None: d.draw_timeseries(metrics, indust_ind, compare_ind, [], path, 1, "value", "light")
+        record(f"draw_timeseries.{page}", timed(draw, repeat, setup=d.data_changed))
+        draw()
+        record(f"draw_timeseries.{page}.cached", timed(draw, repeat))
+
+    # ----- Period pyramid: building it, then drawing from its coarsest level -----
+    def build_pyramids(_):
+        for col in dict.fromkeys(d.MACRO_METRICS.values()):
+            d.macro_pyramid(d.DEFAULT_RUN, col, d.DATA_VERSION)
+        for col in dict.fromkeys(d.INDUST_METRICS.values()):
+            d.industry_pyramid(d.DEFAULT_RUN, col, d.DATA_VERSION)
+
+    record("period_pyramid", timed(build_pyramids, repeat, setup=d.data_changed))
+    coarsest = d.PERIOD_LEVELS[-1]
+    for page, (metrics, indust_ind, compare_ind, path) in branches.items():
+        draw = lambda _=None: d.draw_timeseries(metrics, indust_ind, compare_ind, [], path, coarsest, "rolling", "light")
+        record(f"draw_timeseries.{page}.level{coarsest}", timed(draw, repeat, setup=lambda: (d.data_changed(), build_pyramids(None))))
+
+    # ----- format_currency_axis -----
+    template = d.figure_template("light")
+
+    def unformatted_figure():
+        fig = go.Figure()
+        for name, x, y in d.figure_series("compare", ["Total Sales"], tuple(industries[:10])):
+            fig.add_trace(go.Bar(x=x, y=y, name=name))
+        return fig
+
+    record("format_currency_axis", timed(lambda fig: d.format_currency_axis(fig, template, "light"), repeat, setup=unformatted_figure))
+
+    # ----- Downloads (the /export route) -----
+    client = d.server.test_client()
+    downloads = {
+        "macro": "scope=macro&metrics=all",
+        "indust": f"scope=indust&metrics=all&industries={industries[0]}",
+        "compare": "scope=compare&metrics=all&industries=all",
+    }
+    formats = ["csv", "csv.gz"] + (["parquet", "feather"] if d.HAVE_ARROW else [])
+
+    def download(url):
+        resp = client.get(url)
+        assert resp.status_code == 200, resp.status_code
+        resp.get_data()
+        resp.close()  # frees the download slot
+
+    for scope, query in downloads.items():
+        for fmt in formats:
+            url = f"/export?{query}&format={fmt}"
+            record(f"export.{scope}.{fmt}", timed(lambda: download(url), repeat))
+
+    return results
+
+
+def compare_results(old, new):
+    print(f"\n{'stage':<32} {'before':>12} {'after':>12} {'ratio':>8}")
+    for stage, stats in new["stages"].items():
+        before = old["stages"].get(stage)
+        if before is None:
+            print(f"{stage:<32} {'-':>12} {stats['median_s'] * 1000:10.2f}ms")
+            continue
+        ratio = stats["median_s"] / max(before["median_s"], 1e-12)
+        flag = "  slower" if ratio > SLOWER_RATIO else ""
+        print(f"{stage:<32} {before['median_s'] * 1000:10.2f}ms {stats['median_s'] * 1000:10.2f}ms {ratio:7.2f}x{flag}")
+
+    # Bytes as sent (typed arrays) before and after
+    old_payloads = old.get("payloads", {})
+    for name, sizes in new.get("payloads", {}).items():
+        before = old_payloads.get(name, {}).get("typed_arrays")
+        after = sizes["typed_arrays"]
+        ratio = f"{after / before:7.2f}x" if before else ""
+        print(f"payload.{name:<24} {before / 1e3 if before else 0:10.1f}kB {after / 1e3:10.1f}kB {ratio}")
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    data_dir = prepare_data(args)
+    os.environ["ABEM_BASE_DIR"] = data_dir
+    os.environ["ABEM_STORAGE"] = args.storage
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    t0 = time.perf_counter()
+    import Dashboard_for_ABEM as d
+    import_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    d.create_app({"BACKGROUND_LOAD": False})
+    load_s = time.perf_counter() - t0
+    print(f"[bench] import {import_s:.3f}s, load {load_s:.3f}s")
+
+    import numpy, pandas, plotly, dash
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "data": data_dir,
+            "storage": d.STORAGE,
+            "rows": sum(sl.stop - sl.start for sl in d.industry_slices.values()),
+            "industries": len(d.industry_slices),
+            "periods": len(d.macro_df),
+            "repeat": args.repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "versions": {m.__name__: m.__version__ for m in (numpy, pandas, plotly, dash)},
+        },
+        "stages": {
+            "import": {"runs": 1, "min_s": import_s, "median_s": import_s, "mean_s": import_s},
+            "startup.load": {"runs": 1, "min_s": load_s, "median_s": load_s, "mean_s": load_s},
+        },
+    }
+    results["stages"].update(run_benchmarks(d, args.repeat))
+    results["payloads"] = payload_sizes(d)
+
+    if args.out:
+        with open(args.out, "w") as fh:
+            json.dump(results, fh, indent=2)
+        print(f"[bench] results written to {args.out}")
+    if args.compare:
+        with open(args.compare) as fh:
+            compare_results(json.load(fh), results)
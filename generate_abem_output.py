@@ -0,0 +1,90 @@
+import os
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# =========================================================
+# SYNTHETIC ABEM OUTPUT
+# =========================================================
+# Writes Industrial_results_for_period_*.csv and Economy-wide_periodic_results.csv
+# in the layout the dashboard reads, at any scale:
+#   python generate_abem_output.py OUT_DIR --industries 100 --periods 200 --extra-columns 40
+
+
+def industry_paths(rng, industries, periods):
+    """
+    Production level per (period, industry): a random walk in logs with a
+    drift and volatility of its own for each industry, on a heavy-tailed
+    spread of industry sizes.
+    """
+    size = rng.lognormal(mean=7.0, sigma=1.5, size=industries)
+    drift = rng.normal(0.004, 0.003, size=industries)
+    vol = rng.uniform(0.01, 0.05, size=industries)
+    shocks = rng.normal(drift, vol, size=(periods, industries))
+    return size * np.exp(np.cumsum(shocks, axis=0))
+
+
+def period_frame(rng, production, deflator, extra_columns):
+    n = len(production)
+    noise = lambda scale: rng.normal(1.0, scale, size=n)
+    imports = production * rng.uniform(0.05, 0.4, size=n) * noise(0.05)
+    exports = production * rng.uniform(0.0, 0.5, size=n) * noise(0.05)
+    goods = production + imports
+    # Some real headers carry stray whitespace (stripped by the loader); kept here too
+    frame = pd.DataFrame({
+        " Industry ID": np.arange(1, n + 1),
+        "Total domestic production CP": production * deflator,
+        "Total domestic production CVM ": production,
+        "Imports CVM": imports,
+        "Actual Exports CVM": exports,
+        "Total Sales": goods * rng.uniform(0.85, 1.0, size=n),
+        "Total Goods for Sale": goods,
+    })
+    # Columns the dashboard does not read, so ingestion has to skip them as it does on real output
+    for j in range(extra_columns):
+        if j % 4 == 3:
+            frame[f"Extra count {j}"] = rng.integers(0, 10_000, size=n)
+        else:
+            frame[f"Extra metric {j}"] = production * rng.uniform(0.0, 1.0, size=n)
+    return frame
+
+
+def generate(out_dir, industries=50, periods=100, extra_columns=20, seed=0):
+    """Writes one synthetic run to out_dir and returns the list of files written."""
+    rng = np.random.default_rng(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    production = industry_paths(rng, industries, periods)
+    deflator = np.cumprod(rng.normal(1.005, 0.003, size=periods))
+
+    written = []
+    for p in range(periods):
+        fp = os.path.join(out_dir, f"Industrial_results_for_period_{p + 1}.csv")
+        period_frame(rng, production[p], deflator[p], extra_columns).to_csv(fp, index=False)
+        written.append(fp)
+
+    # Observed aggregates: the simulated total plus a measurement error
+    total = production.sum(axis=1)
+    economy = pd.DataFrame({
+        "Period": np.arange(1, periods + 1),
+        "Observed domestic production CP": total * deflator * rng.normal(1.0, 0.02, size=periods),
+        "Observed domestic production CVM": total * rng.normal(1.0, 0.02, size=periods),
+        "Unemployment rate": rng.uniform(0.03, 0.08, size=periods),
+    })
+    fp = os.path.join(out_dir, "Economy-wide_periodic_results.csv")
+    economy.to_csv(fp, index=False)
+    written.append(fp)
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write synthetic ABEM simulation output.")
+    parser.add_argument("out_dir")
+    parser.add_argument("--industries", type=int, default=50)
+    parser.add_argument("--periods", type=int, default=100)
+    parser.add_argument("--extra-columns", type=int, default=20, help="columns the dashboard ignores")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    files = generate(args.out_dir, args.industries, args.periods, args.extra_columns, args.seed)
+    size = sum(os.path.getsize(fp) for fp in files)
+    print(f"[generate] {len(files)} files, {size / 1e6:,.1f} MB in {args.out_dir}")